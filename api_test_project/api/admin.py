@@ -1,7 +1,141 @@
+from django import forms
 from django.contrib import admin
+from django.contrib.admin.utils import get_fields_from_path, lookup_needs_distinct
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
 
-from .models import Certificate, Farmer, Product
+from .certifications import invalidate_certified_farmer_counts
+from .models import (ArchivedCertificate, Certificate, Cooperative, Farmer,
+                     Product)
+from .traceability import check_intrants
 
-admin.site.register(Farmer)
-admin.site.register(Product)
-admin.site.register(Certificate)
+
+class EstimatedCountPaginator(Paginator):
+    """
+        Paginator using the table statistics of PostgreSQL instead of a
+        `COUNT(*)` for the unfiltered changelists of the large tables.
+        The exact count is used for the filtered lists, the small tables
+        and the other databases.
+    """
+    estimate_threshold = 100000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        query = getattr(queryset, 'query', None)
+        if query is not None and not query.where and connections[queryset.db].vendor == 'postgresql':
+            with connections[queryset.db].cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples FROM pg_class WHERE relname = %s',
+                    [queryset.model._meta.db_table]
+                )
+                row = cursor.fetchone()
+            if row is not None and row[0] >= self.estimate_threshold:
+                return int(row[0])
+        return super().count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+        ModelAdmin for the large tables: estimated count for the pagination,
+        no second count of the whole table when filtering, and exact lookups
+        on indexed columns for the search instead of `icontains` scans.
+        A search term is compared to each field of `search_fields` it can be
+        converted to (a text is not looked up in a number column).
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+
+        condition = Q()
+        for field_name in self.search_fields:
+            field = get_fields_from_path(self.model, field_name)[-1]
+            try:
+                value = field.to_python(search_term)
+            except ValidationError:
+                continue
+            condition |= Q(**{field_name: value})
+        if not condition:
+            return queryset.none(), False
+
+        use_distinct = any(
+            lookup_needs_distinct(self.opts, field_name) for field_name in self.search_fields
+        )
+        return queryset.filter(condition), use_distinct
+
+
+admin.site.register(Cooperative)
+
+
+@admin.register(Farmer)
+class FarmerAdmin(LargeTableAdmin):
+    list_display = ('nom', 'numero_siret', 'adresse')
+    search_fields = ('nom', 'numero_siret')
+
+
+class ProductAdminForm(forms.ModelForm):
+
+    def clean_intrants(self):
+        intrants = self.cleaned_data['intrants']
+        # vérifié de nouveau à l'écriture, voir signals.check_intrants_cycle
+        if self.instance.pk is not None and intrants:
+            check_intrants(
+                self.instance.pk, [product.pk for product in intrants], self.instance._state.db
+            )
+        return intrants
+
+
+@admin.register(Product)
+class ProductAdmin(LargeTableAdmin):
+    form = ProductAdminForm
+    list_display = ('__str__', 'unite', 'codification_internationnale')
+    search_fields = ('nom', 'codification_internationnale')
+    raw_id_fields = ('producteurs', 'intrants')
+
+    def get_queryset(self, request):
+        # Product.__str__ affiche les producteurs
+        return super().get_queryset(request).prefetch_related('producteurs')
+
+
+class DeletedListFilter(admin.SimpleListFilter):
+    title = 'supprimé'
+    parameter_name = 'supprime'
+
+    def lookups(self, request, model_admin):
+        return (('oui', 'oui'), ('non', 'non'))
+
+    def queryset(self, request, queryset):
+        if self.value() in ('oui', 'non'):
+            return queryset.filter(date_suppression__isnull=self.value() == 'non')
+        return queryset
+
+
+@admin.register(Certificate)
+class CertificateAdmin(LargeTableAdmin):
+    # manager par défaut: les certificats supprimés sont listés, et restaurables
+    list_display = ('nom', 'type', 'farmer_certifie', 'date_suppression')
+    list_select_related = ('farmer_certifie',)
+    list_filter = ('type', DeletedListFilter)
+    search_fields = ('farmer_certifie__nom',)
+    raw_id_fields = ('farmer_certifie',)
+    actions = ('restore',)
+
+    def restore(self, request, queryset):
+        queryset.filter(date_suppression__isnull=False).update(date_suppression=None)
+        # update() n'envoie pas post_save
+        invalidate_certified_farmer_counts()
+    restore.short_description = 'Restaurer les certificats supprimés'
+
+
+@admin.register(ArchivedCertificate)
+class ArchivedCertificateAdmin(LargeTableAdmin):
+    list_display = ('nom', 'type', 'farmer_certifie_id', 'date_fin_validite', 'date_suppression')
+    list_filter = ('type',)
+    search_fields = ('certificate_id', 'farmer_certifie_id')
@@ -0,0 +1,94 @@
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import ArchivedCertificate, Certificate
+
+# version des comptes en cache, incrémentée à chaque modification d'un certificat
+COUNTS_VERSION_KEY = 'api:certified-counts:version'
+# borne la durée d'un compte périmé: suppressions en masse, autres processus
+COUNTS_TIMEOUT = 300
+
+
+def valid_at(date):
+    """
+        Return the condition of the certificates valid at this date,
+        an empty bound being unbounded.
+    """
+    return (
+        (Q(date_debut_validite__isnull=True) | Q(date_debut_validite__lte=date))
+        & (Q(date_fin_validite__isnull=True) | Q(date_fin_validite__gte=date))
+    )
+
+
+def reads_archive(date):
+    """
+        Return True if the certificates valid at this date may be archived:
+        'archive_certificates' moves the certificates expired before today.
+    """
+    return date < timezone.localdate()
+
+
+def certified_at(type, date):
+    """
+        Return the condition of the farmers holding a certificate of this
+        type valid at this date, a semi-join on the index 'api_certificate_validity_idx':
+        'farmer.id IN (SELECT farmer_certifie_id ...)'. Before today, a second
+        semi-join reads the certificates moved to the archive.
+    """
+    condition = Q(pk__in=Certificate.active.filter(valid_at(date), type=type).values('farmer_certifie'))
+    if reads_archive(date):
+        # les certificats supprimés ne sont pas lus, comme avec Certificate.active
+        condition |= Q(pk__in=ArchivedCertificate.objects.filter(
+            valid_at(date), type=type, date_suppression__isnull=True
+        ).values('farmer_certifie_id'))
+    return condition
+
+
+def certified_farmers(farmers, type, date):
+    """
+        Restrict the farmers queryset to the farmers holding a certificate of
+        this type valid at this date, in one query.
+    """
+    return farmers.filter(certified_at(type, date))
+
+
+def certified_farmer_counts(farmers, date, scope=None):
+    """
+        Return {type: number of farmers certified at this date} for every type
+        of `Certificate.TYPE_CHOICES`, counted among the farmers queryset with
+        one GROUP BY query, or one query counting `certified_at` for each type
+        before today. The result is cached per scope (the cooperative) and date
+        until a certificate is saved or archived.
+    """
+    version = cache.get_or_set(COUNTS_VERSION_KEY, 0, None)
+    key = f'api:certified-counts:{version}:{scope}:{date.isoformat()}'
+    counts = cache.get(key)
+    if counts is None:
+        types = [type for type, _ in Certificate.TYPE_CHOICES]
+        if reads_archive(date):
+            # un farmer certifié dans les deux tables compte une fois
+            result = farmers.order_by().aggregate(**{
+                f'count_{index}': Count('pk', filter=certified_at(type, date))
+                for index, type in enumerate(types)
+            })
+            counts = {type: result[f'count_{index}'] for index, type in enumerate(types)}
+        else:
+            counts = dict.fromkeys(types, 0)
+            counts.update(
+                Certificate.active.using(farmers.db)
+                .filter(valid_at(date), farmer_certifie__in=farmers.values('pk'))
+                .order_by()
+                .values_list('type')
+                .annotate(count=Count('farmer_certifie', distinct=True))
+            )
+        cache.set(key, counts, COUNTS_TIMEOUT)
+    return counts
+
+
+def invalidate_certified_farmer_counts():
+    try:
+        cache.incr(COUNTS_VERSION_KEY)
+    except ValueError:
+        # clé absente ou expirée
+        cache.set(COUNTS_VERSION_KEY, 1, None)
@@ -0,0 +1,39 @@
+from .models import Cooperative
+from .tenants import tenant_db_alias
+
+
+class TenantRouter:
+    """
+        Route the instances of the cooperatives listed in
+        `settings.TENANT_DATABASES` to their own database.
+
+        Django gives no instance for the querysets, so the views select the
+        database with `tenants.scope_queryset` and the serializers create the
+        instances on it (see `TenantDatabaseMixin`); the router handles the
+        saves, deletes and related lookups of the instances. The cooperatives
+        are kept on the default database, their rows are not copied to the
+        databases of the cooperatives: the 'cooperative' foreign keys have no
+        database constraint.
+    """
+
+    def db_for_instance(self, model, instance):
+        if model is Cooperative:
+            return 'default'
+        if instance is None:
+            return None
+        if isinstance(instance, Cooperative):
+            # instance liée à une coopérative, ex. Farmer(cooperative=...)
+            return tenant_db_alias(instance.pk)
+        return tenant_db_alias(getattr(instance, 'cooperative_id', None))
+
+    def db_for_read(self, model, **hints):
+        return self.db_for_instance(model, hints.get('instance'))
+
+    def db_for_write(self, model, **hints):
+        return self.db_for_instance(model, hints.get('instance'))
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # la coopérative, sur la base par défaut, peut être liée aux instances de toutes les bases
+        if isinstance(obj1, Cooperative) or isinstance(obj2, Cooperative):
+            return True
+        return None
@@ -0,0 +1,38 @@
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from .certifications import certified_farmers
+from .models import Certificate
+
+
+def get_date_param(request, name='at'):
+    """
+        Return the date of the query parameter 'YYYY-MM-DD', today without parameter.
+    """
+    value = request.query_params.get(name)
+    if not value:
+        return timezone.localdate()
+    try:
+        date = parse_date(value)
+    except ValueError:
+        date = None
+    if date is None:
+        raise ValidationError({name: f'Invalid date "{value}", use the format YYYY-MM-DD.'})
+    return date
+
+
+class CertifiedFilter(BaseFilterBackend):
+    """
+        Filter the farmers holding a certificate of a type, valid at a date:
+        'GET /farmer/?certified=biologique&at=2020-01-31', today without 'at'.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        type = request.query_params.get('certified')
+        if not type:
+            return queryset
+        if type not in dict(Certificate.TYPE_CHOICES):
+            raise ValidationError({'certified': f'Unknown certificate type "{type}".'})
+        return certified_farmers(queryset, type, get_date_param(request))
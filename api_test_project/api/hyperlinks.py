@@ -0,0 +1,99 @@
+import re
+
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.urls import get_script_prefix
+from rest_framework.relations import HyperlinkedIdentityField
+from rest_framework.reverse import preserve_builtin_query_params, reverse
+
+
+class DetailURLBuilder:
+    """
+        Build the urls of the detail routes by string concatenation instead of
+        resolving the whole url patterns list with `reverse` for each row.
+
+        The router registers its detail view names, the first call for a view
+        reverses it once with placeholders to compile the route template,
+        then each url is built from that template. The result is the same as
+        `rest_framework.reverse.reverse(view_name, kwargs={'pk': pk}, ...)`,
+        which is still used for anything else than an integer pk.
+    """
+    PK_PLACEHOLDER = 'pkplaceholder'
+    FORMAT_PLACEHOLDER = 'formatplaceholder'
+    # même contrainte que le groupe 'format' de format_suffix_patterns
+    FORMAT_REGEX = re.compile('[a-z0-9]+')
+
+    def __init__(self):
+        self.view_names = set()
+        self.templates = dict()
+
+    def register(self, view_name):
+        self.view_names.add(view_name)
+
+    def clear(self):
+        self.templates.clear()
+
+    def compile(self, view_name, with_format):
+        kwargs = {'pk': self.PK_PLACEHOLDER}
+        if with_format:
+            kwargs['format'] = self.FORMAT_PLACEHOLDER
+        path = reverse(view_name, kwargs=kwargs)
+        # le préfixe du script peut changer d'une requête à l'autre
+        path = path[len(get_script_prefix()):]
+        before_pk, after_pk = path.split(self.PK_PLACEHOLDER)
+        if with_format:
+            template = (before_pk,) + tuple(after_pk.split(self.FORMAT_PLACEHOLDER))
+        else:
+            template = (before_pk, after_pk)
+        self.templates[view_name, with_format] = template
+        return template
+
+    def path(self, view_name, pk, format=None):
+        template = self.templates.get((view_name, format is not None))
+        if template is None:
+            template = self.compile(view_name, format is not None)
+        if format is None:
+            return get_script_prefix() + template[0] + str(pk) + template[1]
+        return get_script_prefix() + template[0] + str(pk) + template[1] + format + template[2]
+
+    def reverse(self, view_name, pk, request=None, format=None):
+        if (
+            view_name not in self.view_names
+            or type(pk) is not int
+            or (format is not None and not self.FORMAT_REGEX.fullmatch(format))
+            or getattr(request, 'versioning_scheme', None) is not None
+        ):
+            return reverse(view_name, kwargs={'pk': pk}, request=request, format=format)
+
+        url = self.path(view_name, pk, format)
+        if request is None:
+            return url
+        # scheme et host calculés une fois par requête
+        base = getattr(request, '_detail_url_base', None)
+        if base is None:
+            base = request.build_absolute_uri('/')[:-1]
+            request._detail_url_base = base
+        return preserve_builtin_query_params(base + url, request)
+
+
+detail_url_builder = DetailURLBuilder()
+
+
+@receiver(setting_changed)
+def clear_detail_url_templates(*, setting, **kwargs):
+    if setting == 'ROOT_URLCONF':
+        detail_url_builder.clear()
+
+
+class BuilderHyperlinkedIdentityField(HyperlinkedIdentityField):
+    """
+        `url` field of the serializers, built with `detail_url_builder`.
+    """
+
+    def get_url(self, obj, view_name, request, format):
+        # Unsaved objects will not yet have a valid URL.
+        if hasattr(obj, 'pk') and obj.pk in (None, ''):
+            return None
+        if self.lookup_field != 'pk' or self.lookup_url_kwarg != 'pk':
+            return super().get_url(obj, view_name, request, format)
+        return detail_url_builder.reverse(view_name, obj.pk, request, format)
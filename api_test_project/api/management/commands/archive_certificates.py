@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from api.certifications import invalidate_certified_farmer_counts
+from api.models import ArchivedCertificate, Certificate
+
+
+class Command(BaseCommand):
+    help = "Move the expired or deleted certificates to the archive table, by batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="certificates moved per transaction")
+        parser.add_argument('--database', default='default', help="database alias")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        using = options['database']
+        archivable = Certificate.objects.using(using).filter(
+            Q(date_suppression__isnull=False) | Q(date_fin_validite__lt=timezone.localdate())
+        ).order_by('pk')
+
+        archived = 0
+        while True:
+            with transaction.atomic(using=using):
+                batch = list(archivable.select_for_update()[:batch_size])
+                if not batch:
+                    break
+                ArchivedCertificate.objects.using(using).bulk_create(
+                    ArchivedCertificate(
+                        certificate_id=certificate.pk,
+                        nom=certificate.nom,
+                        type=certificate.type,
+                        farmer_certifie_id=certificate.farmer_certifie_id,
+                        cooperative_id=certificate.cooperative_id,
+                        date_debut_validite=certificate.date_debut_validite,
+                        date_fin_validite=certificate.date_fin_validite,
+                        date_suppression=certificate.date_suppression,
+                    )
+                    for certificate in batch
+                )
+                Certificate.objects.using(using).filter(
+                    pk__in=[certificate.pk for certificate in batch]
+                ).delete()
+            archived += len(batch)
+
+        invalidate_certified_farmer_counts()
+
+        self.stdout.write(f'{archived} certificates archived.')
@@ -0,0 +1,128 @@
+import gc
+import json
+import time
+import tracemalloc
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from rest_framework.utils.encoders import JSONEncoder
+
+from api.models import Certificate, Farmer, Product
+from api.read_models import ReadModel
+from api.serializers import (CertificateSerializer, FarmerSerializer,
+                             ProductSerializer)
+
+from ..helpers import make_siret, test_database
+
+SERIALIZERS = {
+    'farmer': FarmerSerializer,
+    'product': ProductSerializer,
+    'certificate': CertificateSerializer,
+}
+
+
+def batches(objs, size):
+    objs = iter(objs)
+    while True:
+        batch = list(islice(objs, size))
+        if not batch:
+            return
+        yield batch
+
+
+def measure(func):
+    """
+        Run the function and return its (result, seconds, peak of memory allocated in bytes).
+    """
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = func()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark of the peak memory of a list, measured with tracemalloc on a seeded "
+        "test database: serializer and model instances, read model list, streamed export."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000, help="rows of the list")
+        parser.add_argument('--model', choices=list(SERIALIZERS), default='certificate', help="model listed")
+        parser.add_argument('--chunk-size', type=int, default=ReadModel.chunk_size, help="rows per chunk of the read model")
+        parser.add_argument(
+            '--skip-serializer', action='store_true',
+            help="skip the serializer, slow on large lists (one query per row for the products)"
+        )
+
+    def handle(self, *args, **options):
+        # DEBUG garderait les requêtes en mémoire
+        with test_database(self.stdout), override_settings(DEBUG=False, ALLOWED_HOSTS=['localhost']):
+            self.seed_database(options['model'], options['rows'])
+            self.run_benchmarks(options)
+
+    def seed_database(self, model, rows):
+        number = rows if model == 'farmer' else min(rows, 1000)
+        for batch in batches(range(number), 10000):
+            Farmer.objects.bulk_create(
+                Farmer(nom=f'farmer{i}', numero_siret=make_siret(i + 1), adresse=f'adresse {i}')
+                for i in batch
+            )
+        farmer_ids = list(Farmer.objects.order_by('pk').values_list('pk', flat=True))
+        if model == 'product':
+            through = Product.producteurs.through
+            for batch in batches(range(rows), 10000):
+                products = Product.objects.bulk_create(
+                    Product(nom=f'product{i}', unite='kg', codification_internationnale=f'CI-{i}')
+                    for i in batch
+                )
+                if products[0].pk is None:
+                    products = Product.objects.order_by('-pk')[:len(products)][::-1]
+                through.objects.bulk_create(
+                    through(product_id=product.pk, farmer_id=farmer_ids[i % len(farmer_ids)])
+                    for i, product in zip(batch, products)
+                )
+        elif model == 'certificate':
+            types = [choice for choice, _ in Certificate.TYPE_CHOICES]
+            for batch in batches(range(rows), 10000):
+                Certificate.objects.bulk_create(
+                    Certificate(
+                        nom=f'certificate{i}', type=types[i % len(types)],
+                        farmer_certifie_id=farmer_ids[i % len(farmer_ids)]
+                    )
+                    for i in batch
+                )
+        self.stdout.write(f'Seeded {rows} rows of {model}.')
+
+    def run_benchmarks(self, options):
+        serializer_class = SERIALIZERS[options['model']]
+        queryset = serializer_class.Meta.model.objects.all()
+        request = Request(APIRequestFactory().get('/', HTTP_HOST='localhost'))
+        context = {'request': request, 'format': None}
+        read_model = ReadModel(serializer_class(context=context), chunk_size=options['chunk_size'])
+
+        def export():
+            return sum(1 for row in read_model.rows(queryset) if json.dumps(row, cls=JSONEncoder))
+
+        benchmarks = [
+            ('serializer, many=True', lambda: len(serializer_class(queryset, many=True, context=context).data)),
+            ('read model, list', lambda: len(list(read_model.rows(queryset)))),
+            ('read model, export', export),
+        ]
+        if options['skip_serializer']:
+            benchmarks.pop(0)
+        for name, func in benchmarks:
+            rows, elapsed, peak = measure(func)
+            self.stdout.write(
+                f'{name:<24} {rows} rows: {elapsed:7.2f}s, peak {peak / 2 ** 20:8.1f} MiB '
+                f'({peak / max(rows, 1):.0f} bytes/row)'
+            )
@@ -0,0 +1,55 @@
+import timeit
+
+from django.core.management.base import BaseCommand
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.models import Certificate
+from api.serializers import CertificateSerializer, FieldPlanMixin
+
+
+class UncachedCertificateSerializer(CertificateSerializer):
+    """
+        CertificateSerializer building its fields from the model for each instance.
+    """
+
+    def get_fields(self):
+        fields = super(FieldPlanMixin, self).get_fields()
+        requested = self.get_requested_fields()
+        if requested is not None:
+            for name in set(fields) - set(requested):
+                fields.pop(name)
+        return fields
+
+
+class Command(BaseCommand):
+    help = "Benchmark of the serialization of certificates: one serializer per row against many=True."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help="certificates serialized")
+        parser.add_argument('--fields', default='id,url,nom,type', help="value of the 'fields' parameter")
+        parser.add_argument('--repeat', type=int, default=3, help="runs, the best one is kept")
+
+    def handle(self, *args, **options):
+        # instances non sauvegardées: pas besoin de base de données
+        rows = [
+            Certificate(id=i, nom=f'certificate{i}', type='biologique', farmer_certifie_id=i)
+            for i in range(1, options['rows'] + 1)
+        ]
+        params = {'fields': options['fields']} if options['fields'] else {}
+        request = Request(APIRequestFactory().get('/', params, HTTP_HOST='localhost'))
+        context = {'request': request}
+
+        def per_row(serializer_class):
+            return lambda: [serializer_class(row, context=context).data for row in rows]
+
+        benchmarks = (
+            ('per row, fields from the model', per_row(UncachedCertificateSerializer)),
+            ('per row, cached field plan', per_row(CertificateSerializer)),
+            ('many=True, cached field plan', lambda: CertificateSerializer(rows, many=True, context=context).data),
+        )
+        expected = benchmarks[0][1]()
+        for name, func in benchmarks:
+            assert func() == expected
+            best = min(timeit.repeat(func, number=1, repeat=options['repeat']))
+            self.stdout.write(f'{name:<32} {len(rows)} rows: {best:.3f}s')
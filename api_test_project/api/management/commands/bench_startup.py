@@ -0,0 +1,90 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# exécuté dans un nouvel interpréteur pour mesurer un démarrage à froid
+STARTUP_SCRIPT = '''
+import json, time
+start = time.perf_counter()
+import django
+django.setup()
+setup = time.perf_counter()
+from django.urls import get_resolver
+get_resolver().url_patterns
+urlconf = time.perf_counter()
+from django.test import Client
+client = Client(HTTP_HOST='localhost')
+client.get('/', HTTP_ACCEPT='application/json')
+first = time.perf_counter()
+client.get('/', HTTP_ACCEPT='application/json')
+second = time.perf_counter()
+print(json.dumps({
+    'setup': setup - start,
+    'urlconf': urlconf - setup,
+    'first request': first - urlconf,
+    'next request': second - first,
+}))
+'''
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the cold start of the project (django.setup, url conf, first request) "
+        "for several settings modules, and list the slowest imports."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'settings_modules', nargs='*',
+            default=['api_test_project.settings', 'api_test_project.settings_api'],
+            help="settings modules to compare"
+        )
+        parser.add_argument('--runs', type=int, default=5, help="processes started per settings module")
+        parser.add_argument('--audit', type=int, default=15, help="number of slowest imports listed")
+
+    def handle(self, *args, **options):
+        for settings_module in options['settings_modules']:
+            self.stdout.write(f'== {settings_module}')
+            runs = [self.run_startup(settings_module) for _ in range(options['runs'])]
+            for step in runs[0]:
+                median = statistics.median(run[step] for run in runs)
+                self.stdout.write(f'{step:<15} {median * 1000:8.1f} ms')
+            if options['audit']:
+                self.stdout.write('slowest imports (cumulative):')
+                for duration, module in self.audit_imports(settings_module)[:options['audit']]:
+                    self.stdout.write(f'{duration / 1000:8.1f} ms  {module}')
+
+    def run_process(self, settings_module, *python_options):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings_module)
+        return subprocess.run(
+            [sys.executable, *python_options, '-c', STARTUP_SCRIPT],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True,
+        )
+
+    def run_startup(self, settings_module):
+        start = time.perf_counter()
+        result = json.loads(self.run_process(settings_module).stdout)
+        result['process'] = time.perf_counter() - start
+        return result
+
+    def audit_imports(self, settings_module):
+        """
+            Return the (cumulative time in us, module) list of the
+            top level imports, slowest first, using 'python -X importtime'.
+        """
+        stderr = self.run_process(settings_module, '-X', 'importtime').stderr
+        imports = list()
+        for line in stderr.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            _, cumulative, module = line.split('|')
+            # seuls les imports de premier niveau, les autres sont inclus dans leur parent
+            if not module.startswith('  '):
+                imports.append((int(cumulative), module.strip()))
+        return sorted(imports, reverse=True)
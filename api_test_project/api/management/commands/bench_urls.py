@@ -0,0 +1,44 @@
+import timeit
+
+from django.core.management.base import BaseCommand
+from django.urls import get_resolver
+from rest_framework.request import Request
+from rest_framework.reverse import reverse
+from rest_framework.test import APIRequestFactory
+
+from api.hyperlinks import detail_url_builder
+
+
+class Command(BaseCommand):
+    help = "Micro-benchmark of the detail urls: `reverse` against the url builder."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--number', type=int, default=100000, help="urls generated per run")
+        parser.add_argument('--repeat', type=int, default=3, help="runs, the best one is kept")
+
+    def handle(self, *args, **options):
+        number = options['number']
+        repeat = options['repeat']
+        # charge le router, qui enregistre les vues de détail dans le builder
+        get_resolver().url_patterns
+        request = Request(APIRequestFactory().get('/', HTTP_HOST='localhost'))
+        view_names = ('farmer-detail', 'product-detail', 'certificate-detail')
+
+        def with_reverse():
+            for i in range(number):
+                reverse(view_names[i % 3], kwargs={'pk': i}, request=request)
+
+        def with_builder():
+            for i in range(number):
+                detail_url_builder.reverse(view_names[i % 3], i, request)
+
+        for i in range(100):
+            for view_name in view_names:
+                assert detail_url_builder.reverse(view_name, i, request) == \
+                    reverse(view_name, kwargs={'pk': i}, request=request)
+
+        for name, func in (('reverse', with_reverse), ('url builder', with_builder)):
+            best = min(timeit.repeat(func, number=1, repeat=repeat))
+            self.stdout.write(
+                f'{name:<12} {number} urls: {best:.3f}s ({best / number * 1e6:.2f} us/url)'
+            )
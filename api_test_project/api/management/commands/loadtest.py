@@ -0,0 +1,236 @@
+import bisect
+import http.client
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.test.utils import override_settings
+
+from api.models import Certificate, Farmer, Product
+
+from ..helpers import make_siret, test_database
+
+# nom: poids dans le mélange par défaut
+DEFAULT_MIX = {
+    'farmer-list': 2,
+    'farmer-detail': 10,
+    'product-list': 2,
+    'product-detail': 10,
+    'certificate-list': 2,
+    'certificate-detail': 10,
+    'certificate-search': 5,
+    'certificate-fields': 3,
+    'search-prod-certif': 5,
+    'product-create': 1,
+    'certificate-create': 1,
+}
+
+# bornes supérieures des classes de l'histogramme, en millisecondes
+HISTOGRAM_BOUNDS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+def parse_mix(value):
+    """
+        Parse a mix like 'farmer-list=2,product-detail=10' into {name: weight}.
+    """
+    mix = dict()
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise CommandError(f'Unknown endpoint "{name}", choose among: {", ".join(DEFAULT_MIX)}.')
+        try:
+            mix[name] = int(weight or 1)
+        except ValueError:
+            raise CommandError(f'Invalid weight "{weight}" for "{name}".')
+    return mix
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+def histogram(latencies_ms):
+    """
+        Return the number of latencies in each class of HISTOGRAM_BOUNDS,
+        the last class counting the latencies above the last bound.
+    """
+    counts = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+    for latency in latencies_ms:
+        counts[bisect.bisect_left(HISTOGRAM_BOUNDS, latency)] += 1
+    return counts
+
+
+class QuietWSGIRequestHandler(WSGIRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test: serve the application of api_test_project/wsgi.py in process with a "
+        "threaded server, on a seeded test database, and replay a mix of the api endpoints "
+        "from concurrent workers. Report the throughput, latencies and errors."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=16, help="concurrent clients")
+        parser.add_argument('--duration', type=float, default=10, help="seconds of load")
+        parser.add_argument('--farmers', type=int, default=500, help="farmers seeded, with 2 products and 2 certificates each")
+        parser.add_argument(
+            '--mix', type=parse_mix, default=DEFAULT_MIX,
+            help="endpoints and weights, like 'farmer-detail=10,product-create=1'"
+        )
+        parser.add_argument('--seed', type=int, default=0, help="seed of the random generators")
+
+    def handle(self, *args, **options):
+        # importée ici: construire le WSGIHandler charge toute l'application
+        from api_test_project.wsgi import application
+
+        with test_database(self.stdout), override_settings(ALLOWED_HOSTS=settings.ALLOWED_HOSTS + ['127.0.0.1']):
+            farmers = self.seed_database(options['farmers'])
+            server = ThreadedWSGIServer(('127.0.0.1', 0), QuietWSGIRequestHandler)
+            # le point d'entrée de production, avec ce qui l'enveloppe
+            server.set_app(application)
+            server.daemon_threads = True
+            server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+            server_thread.start()
+            try:
+                results, elapsed = self.run_load(server.server_port, farmers, options)
+            finally:
+                server.shutdown()
+                server.server_close()
+        self.report(results, elapsed)
+
+    def seed_database(self, number):
+        Farmer.objects.bulk_create(
+            Farmer(nom=f'farmer{i}', numero_siret=make_siret(i + 1), adresse=f'adresse {i}')
+            for i in range(number)
+        )
+        farmers = list(Farmer.objects.order_by('pk'))
+        Product.objects.bulk_create(
+            Product(nom=f'product{i}', unite='kg', codification_internationnale=f'CI-{i}')
+            for i in range(2 * number)
+        )
+        products = list(Product.objects.order_by('pk'))
+        through = Product.producteurs.through
+        through.objects.bulk_create(
+            through(product_id=product.pk, farmer_id=farmers[i // 2].pk)
+            for i, product in enumerate(products)
+        )
+        types = [choice for choice, _ in Certificate.TYPE_CHOICES]
+        Certificate.objects.bulk_create(
+            Certificate(nom=f'certificate{i}', type=types[i % len(types)], farmer_certifie=farmers[i // 2])
+            for i in range(2 * number)
+        )
+        self.stdout.write(f'Seeded {number} farmers, {2 * number} products, {2 * number} certificates.')
+        return [(farmer.pk, farmer.nom) for farmer in farmers]
+
+    def build_request(self, name, rng, farmers):
+        """
+            Return the (method, path, body) of a request to the endpoint `name`.
+        """
+        farmer_id, farmer_nom = rng.choice(farmers)
+        row_id = rng.randint(1, 2 * len(farmers))
+        if name == 'farmer-list':
+            return 'GET', '/farmer/', None
+        if name == 'farmer-detail':
+            return 'GET', f'/farmer/{farmer_id}/', None
+        if name == 'product-list':
+            return 'GET', '/product/', None
+        if name == 'product-detail':
+            return 'GET', f'/product/{row_id}/', None
+        if name == 'certificate-list':
+            return 'GET', '/certificate/', None
+        if name == 'certificate-detail':
+            return 'GET', f'/certificate/{row_id}/', None
+        if name == 'certificate-search':
+            return 'GET', f'/certificate/?search={farmer_nom}', None
+        if name == 'certificate-fields':
+            return 'GET', f'/certificate/?search={farmer_nom}&fields=nom,type', None
+        if name == 'search-prod-certif':
+            return 'GET', f'/search-prod-certif/?search={farmer_nom}', None
+        if name == 'product-create':
+            return 'POST', '/product/', {
+                'nom': 'product', 'unite': 'kg', 'codification_internationnale': 'CI',
+                'producteurs': [farmer_id],
+            }
+        if name == 'certificate-create':
+            return 'POST', '/certificate/', {
+                'nom': 'certificate', 'type': 'biologique', 'farmer_certifie': farmer_id,
+            }
+        raise ValueError(name)
+
+    def run_load(self, port, farmers, options):
+        names = list(options['mix'])
+        weights = [options['mix'][name] for name in names]
+        deadline = time.perf_counter() + options['duration']
+        results = [list() for _ in range(options['workers'])]
+
+        def worker(index):
+            rng = random.Random(options['seed'] + index)
+            while time.perf_counter() < deadline:
+                name = rng.choices(names, weights)[0]
+                method, path, body = self.build_request(name, rng, farmers)
+                headers = {'Accept': 'application/json'}
+                if body is not None:
+                    body = json.dumps(body)
+                    headers['Content-Type'] = 'application/json'
+                start = time.perf_counter()
+                try:
+                    client = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                    client.request(method, path, body=body, headers=headers)
+                    response = client.getresponse()
+                    response.read()
+                    client.close()
+                    status = response.status
+                except (OSError, http.client.HTTPException):
+                    status = None
+                results[index].append((name, status, (time.perf_counter() - start) * 1000))
+
+        self.stdout.write(
+            f'Running {options["workers"]} workers for {options["duration"]}s on port {port}...'
+        )
+        start = time.perf_counter()
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(options['workers'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return [result for worker_results in results for result in worker_results], time.perf_counter() - start
+
+    def report(self, results, elapsed):
+        by_name = defaultdict(list)
+        for result in results:
+            by_name[result[0]].append(result)
+
+        self.stdout.write(f'\n{len(results)} requests in {elapsed:.1f}s: {len(results) / elapsed:.1f} req/s')
+        self.stdout.write(
+            f'{"endpoint":<20} {"requests":>8} {"errors":>7} {"p50 ms":>8} {"p90 ms":>8} {"p99 ms":>8} {"max ms":>8}'
+        )
+        for name, rows in sorted(by_name.items()) + [('all', results)]:
+            latencies = sorted(latency for _, _, latency in rows)
+            errors = sum(1 for _, status, _ in rows if status is None or status >= 400)
+            self.stdout.write(
+                f'{name:<20} {len(rows):>8} {errors:>7} {percentile(latencies, 0.5):>8.1f} '
+                f'{percentile(latencies, 0.9):>8.1f} {percentile(latencies, 0.99):>8.1f} '
+                f'{(latencies[-1] if latencies else 0):>8.1f}'
+            )
+
+        errors = sum(1 for _, status, _ in results if status is None or status >= 400)
+        self.stdout.write(f'error rate: {100 * errors / max(len(results), 1):.2f}%')
+        self.stdout.write('\nlatency histogram:')
+        counts = histogram([latency for _, _, latency in results])
+        labels = [f'<= {bound} ms' for bound in HISTOGRAM_BOUNDS] + [f'> {HISTOGRAM_BOUNDS[-1]} ms']
+        largest = max(counts) or 1
+        for label, count in zip(labels, counts):
+            self.stdout.write(f'{label:>12} {count:>8} {"#" * round(40 * count / largest)}')
@@ -0,0 +1,34 @@
+import os
+import tempfile
+from contextlib import contextmanager
+
+from django.db import connection
+
+from api.validators import luhn_checksum_is_valid
+
+
+def make_siret(number):
+    """
+        Return a valid siret number built from the 13 first digits `number`.
+    """
+    base = str(number).zfill(13)
+    for check_digit in range(10):
+        if luhn_checksum_is_valid(base + str(check_digit)):
+            return int(base + str(check_digit))
+
+
+@contextmanager
+def test_database(stdout):
+    """
+        Create a test database, on a temporary file for SQLite so that
+        several threads do not share one in-memory database.
+    """
+    with tempfile.TemporaryDirectory() as tmpdir:
+        if connection.vendor == 'sqlite':
+            connection.settings_dict['TEST']['NAME'] = os.path.join(tmpdir, 'loadtest.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        stdout.write(f'Test database: {connection.settings_dict["NAME"]}')
+        try:
+            yield
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
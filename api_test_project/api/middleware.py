@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.urls import reverse
+from django.utils.module_loading import import_string
+
+
+class AdminOnlyMiddleware:
+    """
+        Run the middlewares listed in `settings.ADMIN_MIDDLEWARE` only for the
+        admin urls, the api urls skip them.
+
+        The sessions, authentication and messages are only used by the admin,
+        the api does not need to load a session for each request.
+        The wrapped middlewares are called like a small middleware stack, so
+        only `process_request` / `process_response` hooks are supported
+        (enough for the sessions, authentication and messages middlewares).
+        The admin views are already protected with `csrf_protect`.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.admin_prefix = None
+        handler = get_response
+        for middleware_path in reversed(settings.ADMIN_MIDDLEWARE):
+            handler = import_string(middleware_path)(handler)
+        self.admin_handler = handler
+
+    def __call__(self, request):
+        if self.admin_prefix is None:
+            self.admin_prefix = reverse('admin:index')
+        if request.path.startswith(self.admin_prefix):
+            return self.admin_handler(request)
+        return self.get_response(request)
@@ -0,0 +1,19 @@
+# Generated by Django 2.2.4 on 2026-10-19 12:19
+
+import api.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='farmer',
+            name='numero_siret',
+            field=models.BigIntegerField(unique=True, validators=[api.validators.validate_siret]),
+        ),
+    ]
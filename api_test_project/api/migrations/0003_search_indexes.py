@@ -0,0 +1,28 @@
+# Generated by Django 2.2.4 on 2026-10-19 12:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_farmer_numero_siret_unique'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='farmer',
+            name='nom',
+            field=models.CharField(db_index=True, max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='codification_internationnale',
+            field=models.CharField(db_index=True, max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='nom',
+            field=models.CharField(db_index=True, max_length=50),
+        ),
+    ]
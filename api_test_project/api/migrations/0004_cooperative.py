@@ -0,0 +1,53 @@
+# Generated by Django 2.2.4 on 2026-10-19 12:23
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Cooperative',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nom', models.CharField(max_length=50)),
+                ('slug', models.SlugField(unique=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='certificate',
+            name='cooperative',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, to='api.Cooperative'),
+        ),
+        migrations.AddField(
+            model_name='farmer',
+            name='cooperative',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, to='api.Cooperative'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='cooperative',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, to='api.Cooperative'),
+        ),
+        migrations.AddIndex(
+            model_name='certificate',
+            index=models.Index(fields=['cooperative', 'type'], name='api_certifi_coopera_f15984_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='certificate',
+            index=models.Index(fields=['cooperative', 'farmer_certifie'], name='api_certifi_coopera_9fe7a8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='farmer',
+            index=models.Index(fields=['cooperative', 'nom'], name='api_farmer_coopera_fbeb44_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['cooperative', 'nom'], name='api_product_coopera_5ff7a7_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 2.2.4 on 2026-10-19 12:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_cooperative'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedCertificate',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('certificate_id', models.IntegerField(unique=True)),
+                ('nom', models.CharField(max_length=50)),
+                ('type', models.CharField(choices=[('biologique', 'biologique'), ('sans ogm', 'sans ogm'), ('origine', 'origine')], max_length=50)),
+                ('farmer_certifie_id', models.IntegerField(db_index=True)),
+                ('cooperative_id', models.IntegerField(blank=True, null=True)),
+                ('date_fin_validite', models.DateField(blank=True, null=True)),
+                ('date_suppression', models.DateTimeField(blank=True, null=True)),
+                ('date_archivage', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='certificate',
+            name='date_fin_validite',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='certificate',
+            name='date_suppression',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='certificate',
+            index=models.Index(condition=models.Q(date_suppression__isnull=True), fields=['farmer_certifie', 'type'], name='api_certificate_active_idx'),
+        ),
+    ]
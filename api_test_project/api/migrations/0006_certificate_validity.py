@@ -0,0 +1,27 @@
+# Generated by Django 2.2.4 on 2026-10-19 12:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_certificate_soft_delete_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedcertificate',
+            name='date_debut_validite',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='certificate',
+            name='date_debut_validite',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='certificate',
+            index=models.Index(condition=models.Q(date_suppression__isnull=True), fields=['type', 'farmer_certifie', 'date_debut_validite', 'date_fin_validite'], name='api_certificate_validity_idx'),
+        ),
+    ]
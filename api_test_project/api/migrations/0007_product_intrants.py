@@ -0,0 +1,18 @@
+# Generated by Django 2.2.4 on 2026-10-19 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_certificate_validity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='intrants',
+            field=models.ManyToManyField(blank=True, related_name='produits_derives', to='api.Product'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 2.2.4 on 2026-10-19 12:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_product_intrants'),
+    ]
+
+    # SQLite recrée la table de certificate pour changer la contrainte, sans
+    # savoir recréer les index partiels: ils sont supprimés puis recréés
+    operations = [
+        migrations.RemoveIndex(
+            model_name='certificate',
+            name='api_certificate_active_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='certificate',
+            name='api_certificate_validity_idx',
+        ),
+        migrations.AlterField(
+            model_name='certificate',
+            name='cooperative',
+            field=models.ForeignKey(blank=True, db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, to='api.Cooperative'),
+        ),
+        migrations.AlterField(
+            model_name='farmer',
+            name='cooperative',
+            field=models.ForeignKey(blank=True, db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, to='api.Cooperative'),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='cooperative',
+            field=models.ForeignKey(blank=True, db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, to='api.Cooperative'),
+        ),
+        migrations.AddIndex(
+            model_name='certificate',
+            index=models.Index(condition=models.Q(date_suppression__isnull=True), fields=['farmer_certifie', 'type'], name='api_certificate_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='certificate',
+            index=models.Index(condition=models.Q(date_suppression__isnull=True), fields=['type', 'farmer_certifie', 'date_debut_validite', 'date_fin_validite'], name='api_certificate_validity_idx'),
+        ),
+    ]
@@ -1,22 +1,63 @@
 from django.db import models
+from django.utils import timezone
 
+from .validators import validate_siret
 
-class Farmer(models.Model):
+
+class Cooperative(models.Model):
     nom = models.CharField(max_length=50)
-    numero_siret = models.IntegerField() # 14 chiffres (9 siren + 5 NIC)
+    slug = models.SlugField(unique=True) # valeur de l'en-tête 'X-Cooperative'
+
+    def __str__(self):
+        return self.nom
+
+class Farmer(models.Model):
+    nom = models.CharField(max_length=50, db_index=True)
+    numero_siret = models.BigIntegerField(unique=True, validators=[validate_siret]) # 14 chiffres (9 siren + 5 NIC)
     adresse = models.CharField(max_length=500)
+    # index composites menés par la coopérative, voir Meta.indexes
+    cooperative = models.ForeignKey(
+        Cooperative, null=True, blank=True, on_delete=models.PROTECT, db_index=False,
+        db_constraint=False # la coopérative reste sur la base par défaut, voir db_routers.py
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['cooperative', 'nom']),
+        ]
 
     def __str__(self):
         return self.nom
 
 class Product(models.Model):
-    nom = models.CharField(max_length=50)
+    nom = models.CharField(max_length=50, db_index=True)
     unite = models.CharField(max_length=50)
-    codification_internationnale = models.CharField(max_length=50)
+    codification_internationnale = models.CharField(max_length=50, db_index=True)
     producteurs = models.ManyToManyField(Farmer)
+    # produits ou lots en amont, graphe sans cycle (voir traceability.py)
+    intrants = models.ManyToManyField(
+        'self', symmetrical=False, blank=True, related_name='produits_derives'
+    )
+    cooperative = models.ForeignKey(
+        Cooperative, null=True, blank=True, on_delete=models.PROTECT, db_index=False,
+        db_constraint=False # la coopérative reste sur la base par défaut, voir db_routers.py
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['cooperative', 'nom']),
+        ]
 
     def __str__(self):
-        return f'{self.nom} ({", ".join(p.nom for p in self.producteurs.all())})' # a optimiser avec prefetch_related
+        return f'{self.nom} ({", ".join(p.nom for p in self.producteurs.all())})' # producteurs prefetchés dans ProductAdmin
+
+class ActiveCertificateManager(models.Manager):
+    """
+        Manager of the certificates which are not deleted.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(date_suppression__isnull=True)
 
 class Certificate(models.Model):
     TYPE_CHOICES = [
@@ -27,6 +68,59 @@ class Certificate(models.Model):
     nom = models.CharField(max_length=50)
     type = models.CharField(max_length=50, choices=TYPE_CHOICES) # biologique, sans ogm, origine
     farmer_certifie = models.ForeignKey(Farmer, on_delete=models.CASCADE) # suppression de l'enregistrement certificat si le farmer associé est supprimé
+    cooperative = models.ForeignKey(
+        Cooperative, null=True, blank=True, on_delete=models.PROTECT, db_index=False,
+        db_constraint=False # la coopérative reste sur la base par défaut, voir db_routers.py
+    )
+    date_debut_validite = models.DateField(null=True, blank=True) # vide: valide depuis toujours
+    date_fin_validite = models.DateField(null=True, blank=True) # vide: sans expiration, archivé une fois expiré
+    date_suppression = models.DateTimeField(null=True, blank=True, editable=False) # suppression logique
+
+    objects = models.Manager() # tous les certificats, supprimés compris (admin, archive)
+    active = ActiveCertificateManager() # certificats non supprimés, pour l'api
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['cooperative', 'type']),
+            models.Index(fields=['cooperative', 'farmer_certifie']),
+            models.Index(
+                fields=['farmer_certifie', 'type'],
+                name='api_certificate_active_idx',
+                condition=models.Q(date_suppression__isnull=True)
+            ),
+            # farmers certifiés d'un type à une date
+            models.Index(
+                fields=['type', 'farmer_certifie', 'date_debut_validite', 'date_fin_validite'],
+                name='api_certificate_validity_idx',
+                condition=models.Q(date_suppression__isnull=True)
+            ),
+        ]
+
+    def __str__(self):
+        return self.nom
+
+    def soft_delete(self):
+        """
+            Hide the certificate, it is moved to the archive by the command 'archive_certificates'.
+        """
+        self.date_suppression = timezone.now()
+        self.save(update_fields=['date_suppression'])
+
+class ArchivedCertificate(models.Model):
+    """
+        Expired or deleted certificate, moved out of the Certificate table
+        by the command 'archive_certificates'. The ids are kept as plain
+        integers, the farmer or the cooperative may be deleted later.
+    """
+    certificate_id = models.IntegerField(unique=True)
+    nom = models.CharField(max_length=50)
+    type = models.CharField(max_length=50, choices=Certificate.TYPE_CHOICES)
+    farmer_certifie_id = models.IntegerField(db_index=True)
+    cooperative_id = models.IntegerField(null=True, blank=True)
+    date_debut_validite = models.DateField(null=True, blank=True)
+    date_fin_validite = models.DateField(null=True, blank=True)
+    date_suppression = models.DateTimeField(null=True, blank=True)
+    date_archivage = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return self.nom
@@ -0,0 +1,127 @@
+import json
+from collections import defaultdict
+from itertools import islice
+
+from django.http import StreamingHttpResponse
+from rest_framework import serializers
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from .hyperlinks import detail_url_builder
+
+
+class ReadModel:
+    """
+        Read side of a model serializer, for the large lists and exports.
+        The rows are read as `values_list` tuples, by chunks of `chunk_size`
+        rows from a server-side cursor (`QuerySet.iterator`), and turned into
+        plain dicts equal to the serializer output: no model instance, no bound
+        serializer field and no OrderedDict per row.
+        The many to many fields are read with one query on their through table per chunk.
+    """
+    chunk_size = 2000
+    # champs dont la valeur lue en base est déjà celle de la réponse
+    plain_fields = (
+        serializers.BooleanField,
+        serializers.CharField,
+        serializers.ChoiceField,
+        serializers.IntegerField,
+        serializers.PrimaryKeyRelatedField,
+    )
+
+    def __init__(self, serializer, chunk_size=None):
+        self.model = serializer.Meta.model
+        self.request = serializer.context.get('request')
+        self.format = serializer.context.get('format')
+        if chunk_size is not None:
+            self.chunk_size = chunk_size
+
+        # (nom, index dans le tuple ou None, conversion ou None)
+        self.plan = list()
+        self.columns = ['pk']
+        self.links = dict()
+        self.view_name = None
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, serializers.HyperlinkedIdentityField):
+                self.view_name = field.view_name
+                self.plan.append((name, None, None))
+            elif isinstance(field, serializers.ManyRelatedField):
+                self.links[name] = self.model._meta.get_field(field.source)
+                self.plan.append((name, None, None))
+            else:
+                convert = None if isinstance(field, self.plain_fields) else field.to_representation
+                self.plan.append((name, len(self.columns), convert))
+                self.columns.append(field.source)
+
+    def rows(self, queryset):
+        """
+            Yield the rows of the queryset as dicts, chunk by chunk.
+        """
+        values = queryset.values_list(*self.columns).iterator(chunk_size=self.chunk_size)
+        while True:
+            chunk = list(islice(values, self.chunk_size))
+            if not chunk:
+                return
+            yield from self.build_rows(chunk, queryset.db)
+
+    def build_rows(self, chunk, using):
+        pks = [values[0] for values in chunk]
+        links = {name: self.read_links(field, pks, using) for name, field in self.links.items()}
+        for values in chunk:
+            pk = values[0]
+            row = dict()
+            for name, index, convert in self.plan:
+                if index is not None:
+                    value = values[index]
+                    row[name] = value if convert is None or value is None else convert(value)
+                elif name in links:
+                    row[name] = links[name].get(pk, [])
+                else:
+                    row[name] = detail_url_builder.reverse(self.view_name, pk, self.request, self.format)
+            yield row
+
+    @staticmethod
+    def read_links(field, pks, using):
+        """
+            Return {pk: [related pks]} of the many to many field for the rows `pks`.
+        """
+        source = field.m2m_column_name()
+        target = field.m2m_reverse_name()
+        through = field.remote_field.through._base_manager.using(using)
+        links = defaultdict(list)
+        for pk, related_pk in through.filter(**{f'{source}__in': pks}).order_by(
+            source, target
+        ).values_list(source, target):
+            links[pk].append(related_pk)
+        return links
+
+
+class ReadModelMixin:
+    """
+        Viewset mixin serving the list with `ReadModel`, and the whole filtered
+        list as json lines with 'GET /<model>/export/', streamed chunk by chunk.
+    """
+
+    def get_read_model(self):
+        return ReadModel(self.get_serializer())
+
+    def list(self, request, *args, **kwargs):
+        if self.paginator is not None:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(list(self.get_read_model().rows(queryset)))
+
+    @action(detail=False)
+    def export(self, request, format=None):
+        """
+            Stream all the rows, one json object per line ('application/x-ndjson'),
+            without loading the whole table in memory.
+        """
+        rows = self.get_read_model().rows(self.filter_queryset(self.get_queryset()))
+        return StreamingHttpResponse(
+            (json.dumps(row, cls=JSONEncoder, ensure_ascii=False) + '\n' for row in rows),
+            content_type='application/x-ndjson'
+        )
@@ -0,0 +1,66 @@
+import threading
+import time
+from collections import OrderedDict
+
+from .models import Farmer
+
+
+class SiretRegistry:
+    """
+        In process LRU cache of the farmers, by siret number.
+
+        The farmers are invalidated by the post_save / post_delete signals of
+        Farmer (see signals.py), so only the writes done by this process are
+        seen at once: the updates made with `QuerySet.update` or by another
+        worker are seen when the entry expires, `ttl` seconds after it was read.
+        Keep `maxsize` low enough for the hot farmers only, the lookup in
+        database already uses the unique index.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # (alias, siret) -> (farmer, expiration)
+        self._farmers = OrderedDict()
+        # (alias, pk) -> siret, pour invalider un farmer dont le siret a changé
+        self._sirets = dict()
+        self._lock = threading.Lock()
+
+    def get(self, siret, using='default'):
+        """
+            Return the farmer with this siret number, or None.
+        """
+        key = (using, siret)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._farmers.get(key)
+            if entry is not None:
+                farmer, expiration = entry
+                if expiration > now:
+                    self._farmers.move_to_end(key)
+                    return farmer
+                del self._farmers[key]
+                self._sirets.pop((using, farmer.pk), None)
+
+        farmer = Farmer.objects.using(using).filter(numero_siret=siret).first()
+        if farmer is not None:
+            with self._lock:
+                self._farmers[key] = (farmer, now + self.ttl)
+                self._sirets[using, farmer.pk] = siret
+                if len(self._farmers) > self.maxsize:
+                    (evicted_using, _), (evicted, _) = self._farmers.popitem(last=False)
+                    self._sirets.pop((evicted_using, evicted.pk), None)
+        return farmer
+
+    def invalidate(self, farmer, using='default'):
+        with self._lock:
+            for siret in (self._sirets.pop((using, farmer.pk), None), farmer.numero_siret):
+                self._farmers.pop((using, siret), None)
+
+    def clear(self):
+        with self._lock:
+            self._farmers.clear()
+            self._sirets.clear()
+
+
+siret_registry = SiretRegistry()
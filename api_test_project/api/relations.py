@@ -0,0 +1,76 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework.relations import (MANY_RELATION_KWARGS, ManyRelatedField,
+                                      PrimaryKeyRelatedField)
+
+from .tenants import scope_queryset
+
+
+class BulkManyRelatedField(ManyRelatedField):
+    """
+        `ManyRelatedField` validating all the pks with a single `IN` query,
+        instead of one query per pk. The empty values, errors and validators
+        are the ones of `PrimaryKeyRelatedField`.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        child = self.child_relation
+        queryset = child.get_queryset()
+        pk_model_field = queryset.model._meta.pk
+        # (valeur reçue, pk), ou (valeur, None) pour une valeur vide acceptée
+        pks = list()
+        for item in data:
+            # null et valeurs vides: mêmes erreurs que child.run_validation
+            is_empty, item = child.validate_empty_values(item)
+            if is_empty:
+                pks.append((item, None))
+                continue
+            if child.pk_field is not None:
+                item = child.pk_field.to_internal_value(item)
+            try:
+                pks.append((item, pk_model_field.to_python(item)))
+            except (DjangoValidationError, TypeError, ValueError):
+                child.fail('incorrect_type', data_type=type(item).__name__)
+
+        objects = queryset.in_bulk([pk for item, pk in pks if pk is not None])
+        values = list()
+        for item, pk in pks:
+            if pk is None:
+                values.append(item)
+                continue
+            if pk not in objects:
+                child.fail('does_not_exist', pk_value=item)
+            child.run_validators(objects[pk])
+            values.append(objects[pk])
+        return values
+
+class BulkPrimaryKeyRelatedField(PrimaryKeyRelatedField):
+    """
+        `PrimaryKeyRelatedField` using `BulkManyRelatedField` when `many=True`.
+    """
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
+
+
+class TenantPrimaryKeyRelatedField(BulkPrimaryKeyRelatedField):
+    """
+        `BulkPrimaryKeyRelatedField` accepting only the instances of the
+        cooperative of the request.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        request = self.context.get('request')
+        if request is None:
+            return queryset
+        return scope_queryset(queryset, request)
@@ -0,0 +1,70 @@
+from rest_framework.renderers import JSONRenderer
+
+
+class ColumnarJSONRenderer(JSONRenderer):
+    """
+        Render lists column by column instead of row by row, for bulk reads.
+        Use it with the header 'Accept: application/vnd.columnar+json',
+        the parameter '?format=columnar' or the suffix '.columnar'.
+
+        The rows are split in batches, each batch looks like:
+            {
+                "count": 2,
+                "columns": {
+                    "id": [1, 2],
+                    "type": {"dictionary": ["biologique"], "indices": [0, 0]},
+                    "producteurs": {"offsets": [0, 2, 3], "values": [1, 2, 2]}
+                }
+            }
+        Repeated strings ('type', 'unite') are dictionary encoded and the id lists
+        ('producteurs', 'intrants') are packed in one array, row i being values[offsets[i]:offsets[i + 1]].
+        Anything else than a list (detail, errors) is rendered as plain json.
+    """
+    media_type = 'application/vnd.columnar+json'
+    format = 'columnar'
+    batch_size = 10000
+    dictionary_columns = ('type', 'unite')
+    packed_columns = ('producteurs', 'intrants')
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, list) and all(isinstance(row, dict) for row in data):
+            data = {
+                'count': len(data),
+                'batches': [
+                    self.encode_batch(data[start:start + self.batch_size])
+                    for start in range(0, len(data), self.batch_size)
+                ],
+            }
+        return super().render(data, accepted_media_type, renderer_context)
+
+    def encode_batch(self, rows):
+        # ordre des colonnes: celui des champs de la première ligne
+        names = list()
+        for row in rows:
+            names.extend(name for name in row if name not in names)
+
+        columns = dict()
+        for name in names:
+            values = [row.get(name) for row in rows]
+            if name in self.dictionary_columns:
+                columns[name] = self.encode_dictionary(values)
+            elif name in self.packed_columns:
+                columns[name] = self.encode_packed(values)
+            else:
+                columns[name] = values
+        return {'count': len(rows), 'columns': columns}
+
+    @staticmethod
+    def encode_dictionary(values):
+        dictionary = dict()
+        indices = [dictionary.setdefault(value, len(dictionary)) for value in values]
+        return {'dictionary': list(dictionary), 'indices': indices}
+
+    @staticmethod
+    def encode_packed(values):
+        offsets = [0]
+        packed = list()
+        for value in values:
+            packed.extend(value or ())
+            offsets.append(len(packed))
+        return {'offsets': offsets, 'values': packed}
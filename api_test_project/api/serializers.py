@@ -1,14 +1,116 @@
+import copy
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
 from rest_framework import serializers
+from rest_framework.serializers import raise_errors_on_nested_writes
+from rest_framework.utils import model_meta
+from rest_framework.validators import UniqueValidator
+
+from .hyperlinks import BuilderHyperlinkedIdentityField
+from .models import ArchivedCertificate, Certificate, Farmer, Product
+from .relations import TenantPrimaryKeyRelatedField
+from .traceability import check_intrants, lock_intrants
+
+
+class FieldPlanMixin:
+    """
+        Build the fields of a ModelSerializer once per process for each
+        serializer class and set of requested fields, instead of introspecting
+        the model again for each serializer instance.
+        Each instance gets its own copy of the cached fields, bound to it,
+        so the context (request) is never shared between two serializers.
+        Use `many=True` to share the bound fields between the rows of a response.
+    """
+    _field_plans = dict()
+
+    def get_requested_fields(self):
+        """
+            Return the names of the fields to keep, None to keep them all.
+        """
+        return None
+
+    def get_fields(self):
+        requested = self.get_requested_fields()
+        if requested is not None:
+            # limite la taille du cache aux champs existants
+            requested = frozenset(requested).intersection(self.Meta.fields)
+        key = (type(self), requested)
+        plan = self._field_plans.get(key)
+        if plan is None:
+            plan = super().get_fields()
+            if requested is not None:
+                plan = OrderedDict(
+                    (name, field) for name, field in plan.items() if name in requested
+                )
+            self._field_plans[key] = plan
+        return copy.deepcopy(plan)
 
-from .models import Certificate, Farmer, Product
+class TenantDatabaseMixin:
+    """
+        Create the instances on the database `context['using']`, the database
+        of the cooperative of the request (see `tenants.TenantScopedMixin`),
+        and check the unique fields on it. The updated instances stay on
+        the database they were read from.
+    """
 
+    @property
+    def database(self):
+        return self.context.get('using') or 'default'
+
+    def get_fields(self):
+        fields = super().get_fields()
+        using = self.context.get('using')
+        if using:
+            for field in fields.values():
+                # nouvelle liste: les validateurs sont partagés avec les champs en cache
+                field.validators = [
+                    UniqueValidator(validator.queryset.using(using), validator.message, validator.lookup)
+                    if isinstance(validator, UniqueValidator) else validator
+                    for validator in field.validators
+                ]
+        return fields
+
+    def create(self, validated_data):
+        if not self.context.get('using'):
+            return super().create(validated_data)
+        # ModelSerializer.create, sur la base de la coopérative
+        raise_errors_on_nested_writes('create', self, validated_data)
+        ModelClass = self.Meta.model
+        info = model_meta.get_field_info(ModelClass)
+        many_to_many = {
+            field_name: validated_data.pop(field_name)
+            for field_name, relation_info in info.relations.items()
+            if relation_info.to_many and field_name in validated_data
+        }
+        instance = ModelClass._default_manager.db_manager(self.database).create(**validated_data)
+        for field_name, value in many_to_many.items():
+            getattr(instance, field_name).set(value)
+        return instance
+
+class BatchLookupSerializer(serializers.Serializer):
+    """
+        Farmers requested by 'search-prod-certif-batch': lists of names, ids and siret numbers.
+    """
+    nom = serializers.ListField(child=serializers.CharField(), required=False, default=list)
+    id = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+    numero_siret = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+
+class FarmerSerializer(TenantDatabaseMixin, FieldPlanMixin, serializers.ModelSerializer): 
+    serializer_url_field = BuilderHyperlinkedIdentityField
 
-class FarmerSerializer(serializers.ModelSerializer): 
     class Meta:
         model = Farmer
         fields = ('id','url', 'nom', 'numero_siret', 'adresse')
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(TenantDatabaseMixin, FieldPlanMixin, serializers.ModelSerializer):
+    serializer_url_field = BuilderHyperlinkedIdentityField
+    # une seule requête pour valider tous les producteurs, de la coopérative de la requête
+    serializer_related_field = TenantPrimaryKeyRelatedField
+    # relations mises à jour par diff de la table de liaison
+    link_fields = ('producteurs', 'intrants')
+
     class Meta:
         model = Product
         fields = (
@@ -17,32 +119,117 @@ class ProductSerializer(serializers.ModelSerializer):
             'nom', 
             'unite', 
             'codification_internationnale', 
-            'producteurs'
+            'producteurs',
+            'intrants'
         )
         # depth = 1 supprime la possibilité d'ajouter un producteurs 
         # permets de voir les attributs des producteurs.(nested)
 
-class CertificateSerializer(serializers.ModelSerializer):
+    def validate_intrants(self, intrants):
+        # un produit en amont de lui-même formerait un cycle, vérifié de nouveau dans update
+        if self.instance is not None and intrants:
+            check_intrants(
+                self.instance.pk, [product.pk for product in intrants], self.instance._state.db
+            )
+        return intrants
+
+    def create(self, validated_data):
+        links = {name: validated_data.pop(name, []) for name in self.link_fields}
+        with transaction.atomic(using=self.database):
+            instance = super().create(validated_data)
+            for name, related in links.items():
+                self.update_links(instance, name, related, created=True)
+        return instance
+
+    def update(self, instance, validated_data):
+        links = {
+            name: validated_data.pop(name) for name in self.link_fields if name in validated_data
+        }
+        with transaction.atomic(using=instance._state.db):
+            if links.get('intrants'):
+                # les liens écrits par une autre requête depuis la validation
+                lock_intrants(instance._state.db)
+                try:
+                    check_intrants(
+                        instance.pk, [product.pk for product in links['intrants']], instance._state.db
+                    )
+                except DjangoValidationError as error:
+                    raise serializers.ValidationError({'intrants': error.messages})
+            instance = super().update(instance, validated_data)
+            for name, related in links.items():
+                self.update_links(instance, name, related)
+        return instance
 
-    def __init__(self, *args, **kwargs):
+    @staticmethod
+    def update_links(instance, name, related, created=False):
         """
-            modification du constructeur pour adapter dynamiquement les 
-            champs retournés, grace au paramètre fields.
+            Update the many to many field `name` of the product with only the
+            changed rows of the through table: one select, one delete and one
+            insert at most, instead of clearing and adding back all the rows.
+            Note: the m2m_changed signals are not sent.
         """
-        # Don't pass the 'fields' arg up to the superclass
-        request = kwargs.get('context', {}).get('request')
+        field = Product._meta.get_field(name)
+        source = field.m2m_field_name()
+        target = field.m2m_reverse_name()
+        # la table de liaison n'a pas de coopérative, elle suit la base du produit
+        through = field.remote_field.through.objects.using(instance._state.db)
+        new_ids = {obj.pk for obj in related}
+        old_ids = set()
+        if not created:
+            old_ids = set(
+                through.filter(**{source: instance}).values_list(target, flat=True)
+            )
+
+        removed_ids = old_ids - new_ids
+        if removed_ids:
+            through.filter(**{source: instance, f'{target}__in': removed_ids}).delete()
+        added_ids = new_ids - old_ids
+        if added_ids:
+            through.bulk_create(
+                through.model(**{source: instance, target: related_id})
+                for related_id in sorted(added_ids)
+            )
+
+class CertificateSerializer(TenantDatabaseMixin, FieldPlanMixin, serializers.ModelSerializer):
+    serializer_url_field = BuilderHyperlinkedIdentityField
+    serializer_related_field = TenantPrimaryKeyRelatedField
+
+    def get_requested_fields(self):
+        """
+            adapte dynamiquement les champs retournés,
+            grace au paramètre fields de la requête.
+        """
+        request = self.context.get('request')
         str_fields = request.GET.get('fields', '') if request else None
-        fields = str_fields.split(',') if str_fields else None 
-        # Instantiate the superclass normally
-        super(CertificateSerializer, self).__init__(*args, **kwargs)
-        if fields is not None:
-            # Drop any fields that are not specified in the `fields`
-            # argument.
-            allowed = set(fields)
-            existing = set(self.fields)
-            for field_name in existing - allowed:
-                self.fields.pop(field_name)
+        return str_fields.split(',') if str_fields else None
 
     class Meta:
         model = Certificate
-        fields = ('id', 'url', 'nom', 'type', 'farmer_certifie')
+        fields = (
+            'id',
+            'url',
+            'nom',
+            'type',
+            'farmer_certifie',
+            'date_debut_validite',
+            'date_fin_validite'
+        )
+
+class ArchivedCertificateSerializer(serializers.ModelSerializer):
+    """
+        Certificate moved to the archive, with the fields of CertificateSerializer
+        but the url: the archived certificates have no endpoint.
+    """
+    id = serializers.IntegerField(source='certificate_id', read_only=True)
+    farmer_certifie = serializers.IntegerField(source='farmer_certifie_id', read_only=True)
+
+    class Meta:
+        model = ArchivedCertificate
+        fields = (
+            'id',
+            'nom',
+            'type',
+            'farmer_certifie',
+            'date_debut_validite',
+            'date_fin_validite'
+        )
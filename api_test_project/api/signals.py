@@ -0,0 +1,43 @@
+from django.core.exceptions import ValidationError
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .certifications import invalidate_certified_farmer_counts
+from .models import Certificate, Cooperative, Farmer, Product
+from .registry import siret_registry
+from .tenants import clear_tenant_caches
+from .traceability import check_intrants, lock_intrants, upstream_product_ids
+
+
+@receiver([post_save, post_delete], sender=Farmer)
+def invalidate_siret_registry(sender, instance, using, **kwargs):
+    siret_registry.invalidate(instance, using)
+
+
+@receiver([post_save, post_delete], sender=Cooperative)
+def invalidate_tenant_caches(sender, **kwargs):
+    clear_tenant_caches()
+
+
+# pas de post_delete: il empêcherait les suppressions en cascade directes en SQL,
+# les suppressions en masse invalident elles-mêmes (voir tasks.py)
+@receiver(post_save, sender=Certificate)
+def invalidate_certified_counts(sender, **kwargs):
+    invalidate_certified_farmer_counts()
+
+
+@receiver(m2m_changed, sender=Product.intrants.through)
+def check_intrants_cycle(sender, instance, action, reverse, pk_set, using, **kwargs):
+    """
+        The writes of the intrants through the ORM (admin, `add`, `set`) cannot
+        create a cycle. The serializers write the through table directly and
+        check it themselves.
+    """
+    if action != 'pre_add' or not pk_set:
+        return
+    lock_intrants(using)
+    if not reverse:
+        check_intrants(instance.pk, pk_set, using)
+    elif pk_set & upstream_product_ids([instance.pk], using):
+        # instance devient un intrant de produits déjà en amont de lui
+        raise ValidationError('A product cannot be upstream of itself.', code='cycle')
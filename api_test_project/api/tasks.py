@@ -0,0 +1,53 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connections, transaction
+
+from .certifications import invalidate_certified_farmer_counts
+from .models import Certificate, Farmer, Product
+
+# un seul thread: les suppressions en cascade passent l'une après l'autre
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='api-tasks')
+
+
+def run_in_background(func, *args, using='default', **kwargs):
+    """
+        Run the function in the background thread of the process,
+        once the current transaction is committed.
+    """
+    def task():
+        try:
+            func(*args, using=using, **kwargs)
+        finally:
+            # connexions ouvertes par ce thread
+            connections.close_all()
+
+    transaction.on_commit(lambda: _executor.submit(task), using=using)
+
+
+def delete_in_chunks(queryset, chunk_size, using):
+    """
+        Delete the rows of the queryset by chunks of `chunk_size` rows,
+        each chunk in its own short transaction.
+    """
+    while True:
+        with transaction.atomic(using=using):
+            pks = list(queryset.values_list('pk', flat=True)[:chunk_size])
+            if not pks:
+                return
+            queryset.model._base_manager.using(using).filter(pk__in=pks).delete()
+
+
+def delete_farmer(farmer_id, chunk_size, using='default'):
+    """
+        Delete a farmer, its certificates (deleted or not) and its links to
+        the products by chunks, instead of one cascade locking the tables
+        for the whole deletion.
+    """
+    delete_in_chunks(
+        Certificate.objects.using(using).filter(farmer_certifie_id=farmer_id), chunk_size, using
+    )
+    delete_in_chunks(
+        Product.producteurs.through.objects.using(using).filter(farmer_id=farmer_id), chunk_size, using
+    )
+    Farmer.objects.using(using).filter(pk=farmer_id).delete()
+    invalidate_certified_farmer_counts()
@@ -0,0 +1,129 @@
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from rest_framework.exceptions import NotFound, PermissionDenied
+
+from .models import Cooperative
+
+# en-tête HTTP 'X-Cooperative: <slug>'
+TENANT_HEADER = 'HTTP_X_COOPERATIVE'
+
+
+# slug -> cooperative, vidé par les signaux de Cooperative (voir signals.py)
+_cooperatives = OrderedDict()
+_cooperatives_lock = threading.Lock()
+COOPERATIVES_MAXSIZE = 256
+
+
+def get_cooperative(slug):
+    """
+        Return the cooperative with this slug, or None.
+        Only the cooperatives found are cached: a cooperative created by
+        another worker is found at its first request.
+    """
+    with _cooperatives_lock:
+        cooperative = _cooperatives.get(slug)
+    if cooperative is not None:
+        return cooperative
+    cooperative = Cooperative.objects.using('default').filter(slug=slug).first()
+    if cooperative is not None:
+        with _cooperatives_lock:
+            _cooperatives[slug] = cooperative
+            if len(_cooperatives) > COOPERATIVES_MAXSIZE:
+                _cooperatives.popitem(last=False)
+    return cooperative
+
+
+@lru_cache(maxsize=1)
+def cooperative_databases():
+    """
+        Return the {cooperative pk: database alias} of the cooperatives
+        placed on their own database with `settings.TENANT_DATABASES`.
+    """
+    slugs = settings.TENANT_DATABASES
+    if not slugs:
+        return {}
+    return {
+        pk: slugs[slug]
+        for pk, slug in Cooperative.objects.using('default').filter(slug__in=slugs).values_list('pk', 'slug')
+    }
+
+
+def clear_tenant_caches():
+    with _cooperatives_lock:
+        _cooperatives.clear()
+    cooperative_databases.cache_clear()
+
+
+@receiver(setting_changed)
+def clear_tenant_databases(*, setting, **kwargs):
+    if setting == 'TENANT_DATABASES':
+        cooperative_databases.cache_clear()
+
+
+def tenant_db_alias(cooperative_id):
+    """
+        Return the database alias of a cooperative, None for the default database.
+    """
+    if cooperative_id is None or not settings.TENANT_DATABASES:
+        return None
+    return cooperative_databases().get(cooperative_id)
+
+
+def get_request_cooperative(request):
+    """
+        Return the cooperative of the 'X-Cooperative' header, None without header.
+        The deployments hosting only one cooperative do not send it, the others
+        should refuse the requests without header with `settings.TENANT_HEADER_REQUIRED`.
+    """
+    slug = request.META.get(TENANT_HEADER)
+    if not slug:
+        if settings.TENANT_HEADER_REQUIRED:
+            raise PermissionDenied('The header "X-Cooperative" is required.')
+        return None
+    cooperative = get_cooperative(slug)
+    if cooperative is None:
+        raise NotFound(f'Unknown cooperative "{slug}".')
+    return cooperative
+
+
+def scope_queryset(queryset, request):
+    """
+        Restrict the queryset to the cooperative of the request, on the
+        database of that cooperative. Without header, only the rows attached
+        to no cooperative are visible: leaving the header out never shows
+        the rows of a cooperative.
+    """
+    cooperative = get_request_cooperative(request)
+    if cooperative is None:
+        return queryset.filter(cooperative__isnull=True)
+    alias = tenant_db_alias(cooperative.pk)
+    if alias is not None:
+        queryset = queryset.using(alias)
+    return queryset.filter(cooperative=cooperative)
+
+
+class TenantScopedMixin:
+    """
+        Viewset mixin scoping the queryset to the cooperative of the request,
+        the created instances are attached to that cooperative and written
+        on its database.
+    """
+
+    def get_queryset(self):
+        return scope_queryset(super().get_queryset(), self.request)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        cooperative = get_request_cooperative(self.request)
+        if cooperative is not None:
+            # base des instances créées, voir serializers.TenantDatabaseMixin
+            context['using'] = tenant_db_alias(cooperative.pk)
+        return context
+
+    def perform_create(self, serializer):
+        serializer.save(cooperative=get_request_cooperative(self.request))
@@ -0,0 +1,82 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from api.admin import EstimatedCountPaginator
+from api.models import Certificate, Farmer, Product
+
+
+class TestAdminChangelists(TestCase):
+    """
+    Test the changelists of the admin on Farmer, Product and Certificate.
+    """
+
+    def setUp(self):
+        user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(user)
+        self.farmer = Farmer.objects.create(
+            nom = 'farmer1',
+            numero_siret = 73282932000074,
+            adresse = 'add1'
+        )
+
+    def create_rows(self, number):
+        for i in range(number):
+            product = Product.objects.create(nom=f'product{i}', unite='kg', codification_internationnale=f'CI-{i}')
+            product.producteurs.add(self.farmer)
+            Certificate.objects.create(nom=f'certificate{i}', type='biologique', farmer_certifie=self.farmer)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_changelists_number_of_queries(self):
+        """
+        test the number of queries of the changelists does not depend on the number of rows.
+        """
+        urls = ('/admin/api/farmer/', '/admin/api/product/', '/admin/api/certificate/')
+        self.create_rows(2)
+        queries = [self.count_queries(url) for url in urls]
+        self.create_rows(20)
+        self.assertEqual([self.count_queries(url) for url in urls], queries)
+
+    def test_search_farmer_by_siret_and_name(self):
+        """
+        test the search use exact lookups on the indexed columns.
+        """
+        Farmer.objects.create(nom='farmer10', numero_siret=44306184100047, adresse='add2')
+        response = self.client.get('/admin/api/farmer/', {'q': '73282932000074'})
+        self.assertEqual(list(response.context['cl'].result_list), [self.farmer])
+        response = self.client.get('/admin/api/farmer/', {'q': 'farmer1'})
+        self.assertEqual(list(response.context['cl'].result_list), [self.farmer])
+
+    def test_paginator_exact_count_on_sqlite(self):
+        """
+        test the paginator use the exact count when no estimate is available.
+        """
+        self.create_rows(3)
+        paginator = EstimatedCountPaginator(Product.objects.order_by('pk'), 2)
+        self.assertEqual(paginator.count, 3)
+
+    def test_deleted_certificates_listed_and_restored(self):
+        """
+        test the soft deleted certificates are listed without filter, and can be restored.
+        """
+        self.create_rows(2)
+        deleted = Certificate.objects.first()
+        deleted.soft_delete()
+        response = self.client.get('/admin/api/certificate/')
+        self.assertEqual(len(response.context['cl'].result_list), 2)
+        # pas de filtre sur la liste complète: le nombre de lignes peut être estimé
+        self.assertFalse(response.context['cl'].queryset.query.where)
+        response = self.client.get('/admin/api/certificate/', {'supprime': 'oui'})
+        self.assertEqual(list(response.context['cl'].result_list), [deleted])
+
+        response = self.client.post('/admin/api/certificate/', {
+            'action': 'restore', '_selected_action': [deleted.pk],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Certificate.active.count(), 2)
@@ -0,0 +1,80 @@
+import datetime
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import override_settings
+from rest_framework.test import APIClient, APITestCase
+
+from api.models import ArchivedCertificate, Certificate, Farmer, Product
+from api.tasks import delete_farmer
+
+
+class TestCertificateArchive(APITestCase):
+    """
+    Test the soft deletion and the archive of the certificates.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.farmer = Farmer.objects.create(
+            nom = 'farmer1',
+            numero_siret = 73282932000074,
+            adresse = 'add1'
+        )
+        today = datetime.date.today()
+        self.valid = Certificate.objects.create(
+            nom = 'valid', type = 'biologique', farmer_certifie = self.farmer,
+            date_fin_validite = today
+        )
+        self.expired = Certificate.objects.create(
+            nom = 'expired', type = 'biologique', farmer_certifie = self.farmer,
+            date_fin_validite = today - datetime.timedelta(days=1)
+        )
+        self.deleted = Certificate.objects.create(
+            nom = 'deleted', type = 'origine', farmer_certifie = self.farmer
+        )
+
+    def test_delete_certificate_is_soft(self):
+        """
+        test DELETE hide the certificate but keep the row.
+        """
+        response = self.client.delete(f'/certificate/{self.deleted.pk}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.client.get(f'/certificate/{self.deleted.pk}/').status_code, 404)
+        self.assertNotIn(self.deleted.pk, [c['id'] for c in self.client.get('/certificate/').data])
+        self.assertIsNotNone(Certificate.objects.get(pk=self.deleted.pk).date_suppression)
+
+    def test_archive_expired_and_deleted_certificates(self):
+        """
+        test the command 'archive_certificates' move the expired and deleted certificates.
+        """
+        self.deleted.soft_delete()
+        call_command('archive_certificates', batch_size=1, stdout=StringIO())
+        self.assertEqual(list(Certificate.objects.all()), [self.valid])
+        self.assertEqual(
+            sorted(ArchivedCertificate.objects.values_list('certificate_id', 'nom')),
+            [(self.expired.pk, 'expired'), (self.deleted.pk, 'deleted')]
+        )
+
+    def test_delete_farmer_by_chunks(self):
+        """
+        test the farmer, its certificates and its product links are deleted by chunks.
+        """
+        product = Product.objects.create(nom='product1', unite='kg', codification_internationnale='CI-1')
+        product.producteurs.add(self.farmer)
+        self.deleted.soft_delete()
+        delete_farmer(self.farmer.pk, chunk_size=2)
+        self.assertFalse(Farmer.objects.exists())
+        self.assertFalse(Certificate.objects.exists())
+        self.assertFalse(product.producteurs.exists())
+
+    @override_settings(FARMER_DELETE_CHUNK_SIZE=2)
+    def test_delete_large_farmer_in_background(self):
+        """
+        test DELETE of a farmer with more certificates than a chunk run in the background.
+        """
+        with mock.patch('api.views.run_in_background') as run_in_background:
+            response = self.client.delete(f'/farmer/{self.farmer.pk}/')
+        self.assertEqual(response.status_code, 202)
+        run_in_background.assert_called_once_with(delete_farmer, self.farmer.pk, 2, using='default')
@@ -0,0 +1,136 @@
+import datetime
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from rest_framework.test import APIClient, APITestCase
+
+from api.models import ArchivedCertificate, Certificate, Cooperative, Farmer, Product
+from api.registry import siret_registry
+
+
+class TestCertifiedFarmers(APITestCase):
+    """
+    Test the farmers filter '?certified=<type>&at=<date>' and the counts per type.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        siret_registry.clear()
+        cache.clear()
+        self.farmer_1 = Farmer.objects.create(
+            nom = 'farmer1', numero_siret = 73282932000074, adresse = 'add1'
+        )
+        self.farmer_2 = Farmer.objects.create(
+            nom = 'farmer2', numero_siret = 44306184100047, adresse = 'add2'
+        )
+        self.farmer_3 = Farmer.objects.create(
+            nom = 'farmer3', numero_siret = 12345678000113, adresse = 'add3'
+        )
+        # farmer1: bio sans bornes, farmer2: bio en 2020, farmer3: bio supprimé et origine
+        Certificate.objects.create(
+            nom = 'bio1', type = 'biologique', farmer_certifie = self.farmer_1
+        )
+        Certificate.objects.create(
+            nom = 'bio2', type = 'biologique', farmer_certifie = self.farmer_2,
+            date_debut_validite = datetime.date(2020, 1, 1),
+            date_fin_validite = datetime.date(2020, 12, 31)
+        )
+        Certificate.objects.create(
+            nom = 'bio2bis', type = 'biologique', farmer_certifie = self.farmer_2,
+            date_debut_validite = datetime.date(2020, 6, 1)
+        )
+        Certificate.objects.create(
+            nom = 'bio3', type = 'biologique', farmer_certifie = self.farmer_3
+        ).soft_delete()
+        Certificate.objects.create(
+            nom = 'origine3', type = 'origine', farmer_certifie = self.farmer_3
+        )
+
+    def certified(self, params):
+        response = self.client.get('/farmer/', params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(farmer['id'] for farmer in response.data)
+
+    def test_filter_certified_at_date(self):
+        """
+        test GET '/farmer/?certified=biologique&at=' return the farmers with a certificate valid at that date.
+        """
+        farmer_1, farmer_2, farmer_3 = self.farmer_1.pk, self.farmer_2.pk, self.farmer_3.pk
+        self.assertEqual(self.certified({'certified': 'biologique', 'at': '2019-12-31'}), [farmer_1])
+        self.assertEqual(self.certified({'certified': 'biologique', 'at': '2020-01-01'}), [farmer_1, farmer_2])
+        self.assertEqual(self.certified({'certified': 'biologique', 'at': '2021-01-01'}), [farmer_1, farmer_2])
+        self.assertEqual(self.certified({'certified': 'biologique'}), [farmer_1, farmer_2])
+        self.assertEqual(self.certified({'certified': 'origine'}), [farmer_3])
+        self.assertEqual(self.certified({}), [farmer_1, farmer_2, farmer_3])
+
+    def test_filter_is_one_query(self):
+        """
+        test the filter is a semi-join, not one query per farmer.
+        """
+        with self.assertNumQueries(1):
+            self.client.get('/farmer/', {'certified': 'biologique', 'at': '2020-06-01'})
+
+    def test_filter_invalid_parameters(self):
+        """
+        test an unknown type or a bad date is a '400 Bad Request'.
+        """
+        self.assertEqual(self.client.get('/farmer/', {'certified': 'unknown'}).status_code, 400)
+        self.assertEqual(
+            self.client.get('/farmer/', {'certified': 'biologique', 'at': '2020-13-01'}).status_code, 400
+        )
+
+    def test_certified_counts(self):
+        """
+        test GET '/farmer/certified-counts/' count the certified farmers of each type, once per farmer.
+        """
+        response = self.client.get('/farmer/certified-counts/', {'at': '2020-07-01'})
+        self.assertEqual(response.data, {'biologique': 2, 'sans ogm': 0, 'origine': 1})
+        coop = Cooperative.objects.create(nom='coop1', slug='coop1')
+        farmer_4 = Farmer.objects.create(
+            nom = 'farmer4', numero_siret = 55208131766522, adresse = 'add4', cooperative = coop
+        )
+        Certificate.objects.create(
+            nom = 'bio4', type = 'biologique', farmer_certifie = farmer_4, cooperative = coop
+        )
+        response = self.client.get('/farmer/certified-counts/', {'at': '2020-07-01'}, HTTP_X_COOPERATIVE='coop1')
+        self.assertEqual(response.data, {'biologique': 1, 'sans ogm': 0, 'origine': 0})
+
+    def test_certified_counts_cached_until_certificate_saved(self):
+        """
+        test the counts are cached, and refreshed once a certificate is saved.
+        """
+        url = '/farmer/certified-counts/'
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.data['sans ogm'], 0)
+        Certificate.objects.create(nom = 'ogm1', type = 'sans ogm', farmer_certifie = self.farmer_1)
+        self.assertEqual(self.client.get(url).data['sans ogm'], 1)
+
+    def test_certified_at_past_date_after_archive(self):
+        """
+        test the certificates moved to the archive are still read for a past date.
+        """
+        at = {'at': '2020-03-01'}
+        bio2 = Certificate.objects.get(nom='bio2')
+        product = Product.objects.create(nom = 'product', unite = 'kg', codification_internationnale = 'CI-1')
+        product.producteurs.add(self.farmer_2)
+        call_command('archive_certificates', stdout=StringIO())
+        self.assertTrue(ArchivedCertificate.objects.filter(certificate_id=bio2.pk).exists())
+
+        self.assertEqual(
+            self.certified(dict(at, certified='biologique')), [self.farmer_1.pk, self.farmer_2.pk]
+        )
+        with self.assertNumQueries(1):
+            self.client.get('/farmer/', dict(at, certified='biologique'))
+        response = self.client.get('/farmer/certified-counts/', at)
+        self.assertEqual(response.data, {'biologique': 2, 'sans ogm': 0, 'origine': 1})
+        response = self.client.get(f'/product/{product.pk}/traceability/', at)
+        self.assertEqual(
+            [(c['id'], c['nom']) for c in response.data['farmers'][0]['certificates']], [(bio2.pk, 'bio2')]
+        )
+        # bio3, supprimé puis archivé, n'est pas lu
+        self.assertEqual(
+            self.certified({'certified': 'biologique', 'at': '2021-01-01'}), [self.farmer_1.pk, self.farmer_2.pk]
+        )
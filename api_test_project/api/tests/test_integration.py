@@ -1,9 +1,13 @@
+from unittest import mock
+
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.request import Request
 from rest_framework.test import APIClient, APIRequestFactory, APITestCase
 
+from api.management.helpers import make_siret
 from api.models import Certificate, Farmer, Product
+from api.registry import siret_registry
 from api.serializers import (CertificateSerializer, FarmerSerializer,
                              ProductSerializer)
 
@@ -66,7 +70,7 @@ class TestFarmerApi(APITestCase):
         url = '/farmer/'
         payload = {
             'nom' : 'farmer3',
-            'numero_siret' : 12324134,
+            'numero_siret' : 12324134000009,
             'adresse' : 'add3'
         }
         response = self.client.post(url, payload)
@@ -81,7 +85,7 @@ class TestFarmerApi(APITestCase):
         url = '/farmer/'
         payload = {
             'nom' : False, # CharField
-            'numero_siret' : 12324134,
+            'numero_siret' : 12324134000009,
             'adresse' : 'add3'
         }
         response = self.client.post(url, payload)
@@ -97,7 +101,7 @@ class TestFarmerApi(APITestCase):
             payload = {
                 'id': 1,
                 'nom' : 'farmer1_modify',
-                'numero_siret' : 12324134,
+                'numero_siret' : 12324134000009,
                 'adresse' : 'add3'
             }
             response = self.client.put(url, payload)
@@ -114,7 +118,7 @@ class TestFarmerApi(APITestCase):
             payload = {
                 'id': 1,
                 'nom' : False,
-                'numero_siret' : 12324134,
+                'numero_siret' : 12324134000009,
                 'adresse' : 'add3'
             }
             response = self.client.put(url, payload)
@@ -131,6 +135,103 @@ class TestFarmerApi(APITestCase):
             response = self.client.delete(url)
             self.assertEqual(response.status_code, 204)
 
+    def test_create_new_farmer_with_invalid_siret(self):
+        """
+        test POST: Create a new instance of Farmer with a bad siret checksum or length.
+        """
+        url = '/farmer/'
+        for numero_siret in (12324134000008, 123, 123241340000090):
+            payload = {
+                'nom' : 'farmer3',
+                'numero_siret' : numero_siret,
+                'adresse' : 'add3'
+            }
+            response = self.client.post(url, payload)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('numero_siret', response.data)
+
+    def test_create_new_farmer_with_existing_siret(self):
+        """
+        test POST: two farmers can not have the same siret number.
+        """
+        url = '/farmer/'
+        payload = {
+            'nom' : 'farmer3',
+            'numero_siret' : 12324134000009,
+            'adresse' : 'add3'
+        }
+        self.assertEqual(self.client.post(url, payload).status_code, 201)
+        response = self.client.post(url, payload)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('numero_siret', response.data)
+
+class TestFarmerBySiretApi(APITestCase):
+    """
+    Test the api endpoint '/farmer/by-siret/<siret>/'.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        siret_registry.clear()
+        self.farmer = Farmer.objects.create(
+            nom = 'farmer1',
+            numero_siret = 73282932000074,
+            adresse = 'add1'
+        )
+
+    def test_get_farmer_by_siret(self):
+        """
+        test GET '/farmer/by-siret/<siret>/' return the farmer, and is then served from the cache.
+        """
+        url = '/farmer/by-siret/73282932000074/'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, FarmerSerializer(self.farmer, context=serializer_context).data)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.data['nom'], 'farmer1')
+
+    def test_get_farmer_by_unknown_siret(self):
+        """
+        test GET '/farmer/by-siret/<siret>/' with an unknown siret number.
+        """
+        response = self.client.get('/farmer/by-siret/44306184100047/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_cache_invalidated_on_farmer_change(self):
+        """
+        test the cached farmer is invalidated when it is modified or deleted.
+        """
+        self.client.get('/farmer/by-siret/73282932000074/')
+        payload = {
+            'nom' : 'farmer1_modified',
+            'numero_siret' : 44306184100047,
+            'adresse' : 'add1'
+        }
+        self.client.put(f'/farmer/{self.farmer.pk}/', payload)
+        self.assertEqual(self.client.get('/farmer/by-siret/73282932000074/').status_code, 404)
+        response = self.client.get('/farmer/by-siret/44306184100047/')
+        self.assertEqual(response.data['nom'], 'farmer1_modified')
+
+        self.client.delete(f'/farmer/{self.farmer.pk}/')
+        self.assertEqual(self.client.get('/farmer/by-siret/44306184100047/').status_code, 404)
+
+    def test_cache_expires(self):
+        """
+        test a farmer changed without signal (another worker) is seen once the entry expired.
+        """
+        url = '/farmer/by-siret/73282932000074/'
+        self.client.get(url)
+        Farmer.objects.filter(pk=self.farmer.pk).update(nom='farmer1_modified')
+        self.assertEqual(self.client.get(url).data['nom'], 'farmer1')
+        with mock.patch('api.registry.time.monotonic', return_value=10 ** 9):
+            self.assertEqual(self.client.get(url).data['nom'], 'farmer1_modified')
+        # suppression sans signal, comme par un autre worker
+        Farmer.objects.filter(pk=self.farmer.pk)._raw_delete('default')
+        self.assertEqual(self.client.get(url).status_code, 200)
+        with mock.patch('api.registry.time.monotonic', return_value=2 * 10 ** 9):
+            self.assertEqual(self.client.get(url).status_code, 404)
+
 class TestProductApi(APITestCase):
     """
     Test the api endpoints '/product/' and '/product/<pk>/'.
@@ -265,6 +366,84 @@ class TestProductApi(APITestCase):
             response = self.client.delete(url)
             self.assertEqual(response.status_code, 204)
 
+    def test_modify_product_producteurs_only_changed_rows(self):
+        """
+        test PUT: the producteurs are updated without touching the unchanged rows.
+        """
+        farmer_3 = Farmer.objects.create(nom='farmer3', numero_siret=12345678000113, adresse='add3')
+        through = Product.producteurs.through
+        kept_row = through.objects.get(product=self.product_1, farmer=self.farmer_2)
+        url = f'/product/{self.product_1.pk}/'
+        producteurs = sorted([self.farmer_2.pk, farmer_3.pk])
+        payload = {
+            'nom' : 'product1',
+            'unite' : 4,
+            'codification_internationnale' : 'CI-423',
+            'producteurs': producteurs # farmer 1 removed, farmer 3 added
+        }
+        response = self.client.put(url, payload)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(response.data['producteurs']), producteurs)
+        self.assertTrue(through.objects.filter(pk=kept_row.pk).exists())
+        self.assertEqual(
+            sorted(self.product_1.producteurs.values_list('id', flat=True)), producteurs
+        )
+
+    def test_modify_product_number_of_queries_with_many_producteurs(self):
+        """
+        test PUT: the number of queries does not depend on the number of producteurs.
+        """
+        Farmer.objects.bulk_create(
+            Farmer(nom=f'farmer{i}', numero_siret=make_siret(i), adresse='add') for i in range(3, 53)
+        )
+        ids = list(Farmer.objects.order_by('id').values_list('id', flat=True))
+        url = '/product/2/'
+        payload = {
+            'nom' : 'product2',
+            'unite' : 34,
+            'codification_internationnale' : 'CI-4223413213',
+        }
+        with self.assertNumQueries(10):
+            response = self.client.put(url, dict(payload, producteurs=ids[:1]))
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(10):
+            response = self.client.put(url, dict(payload, producteurs=ids[10:]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(response.data['producteurs']), ids[10:])
+
+    def test_create_product_with_incorrect_producteurs_type(self):
+        """
+        test POST: Create a product with a producteur which is not a pk.
+        """
+        url = '/product/'
+        payload = {
+            'nom' : 'product3',
+            'unite' : 23,
+            'codification_internationnale' : 'ci',
+            'producteurs': [1, 'abc']
+        }
+        response = self.client.post(url, payload)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.data['producteurs'], ['Incorrect type. Expected pk value, received str.']
+        )
+        self.assertEqual(Product.objects.count(), 2)
+
+    def test_create_product_with_null_producteur(self):
+        """
+        test POST: Create a product with a null producteur.
+        """
+        url = '/product/'
+        payload = {
+            'nom' : 'product3',
+            'unite' : 23,
+            'codification_internationnale' : 'ci',
+            'producteurs': [1, None]
+        }
+        response = self.client.post(url, payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['producteurs'], ['This field may not be null.'])
+
 class TestCertificateApi(APITestCase):
     """
     Test the api endpoints '/certificate/' and '/certificate/<pk>/'.
@@ -506,14 +685,229 @@ class TestSearchProdCertifApi(APITestCase):
 
         # assert farmer 1 have certif 1 and product 1
         self.assertEqual(response.data,[
-            {'item_type': 'product', 'data': {'id': 1, 'url': 'http://testserver/product/1/', 'nom': 'product1', 'unite': '4', 'codification_internationnale': 'CI-423', 'producteurs': [1, 2]}},
-            {'item_type': 'certificate', 'data': {'id': 1, 'url': 'http://testserver/certificate/1/', 'nom': 'certificate1', 'type': 'biologique', 'farmer_certifie': 1}}
+            {'item_type': 'product', 'data': {'id': 1, 'url': 'http://testserver/product/1/', 'nom': 'product1', 'unite': '4', 'codification_internationnale': 'CI-423', 'producteurs': [1, 2], 'intrants': []}},
+            {'item_type': 'certificate', 'data': {'id': 1, 'url': 'http://testserver/certificate/1/', 'nom': 'certificate1', 'type': 'biologique', 'farmer_certifie': 1, 'date_debut_validite': None, 'date_fin_validite': None}}
         ])
         response = self.client.get(url, payload_2)
 
         # assert farmer 2 have certif 2 and product 1 & 2
         self.assertEqual(response.data,[
-            {'item_type': 'product', 'data': {'id': 1, 'url': 'http://testserver/product/1/', 'nom': 'product1', 'unite': '4', 'codification_internationnale': 'CI-423', 'producteurs': [1, 2]}},
-            {'item_type': 'product', 'data': {'id': 2, 'url': 'http://testserver/product/2/', 'nom': 'product2', 'unite': '34', 'codification_internationnale': 'CI-4223413213', 'producteurs': [2]}},
-            {'item_type': 'certificate', 'data': {'id': 2, 'url': 'http://testserver/certificate/2/', 'nom': 'certificat2', 'type': 'sans ogm', 'farmer_certifie': 2}}
+            {'item_type': 'product', 'data': {'id': 1, 'url': 'http://testserver/product/1/', 'nom': 'product1', 'unite': '4', 'codification_internationnale': 'CI-423', 'producteurs': [1, 2], 'intrants': []}},
+            {'item_type': 'product', 'data': {'id': 2, 'url': 'http://testserver/product/2/', 'nom': 'product2', 'unite': '34', 'codification_internationnale': 'CI-4223413213', 'producteurs': [2], 'intrants': []}},
+            {'item_type': 'certificate', 'data': {'id': 2, 'url': 'http://testserver/certificate/2/', 'nom': 'certificat2', 'type': 'sans ogm', 'farmer_certifie': 2, 'date_debut_validite': None, 'date_fin_validite': None}}
         ])
+
+    def test_search_certificate_and_product_filter_certificate_fields(self):
+        """
+        test GET /search-prod-certif/' with the parameter 'fields' filter the fields of the certificates.
+        """
+        url = '/search-prod-certif/'
+        response = self.client.get(url, {'search': 'farmer2', 'fields': 'nom,type,unknown'})
+        self.assertEqual(response.data[-1], {'item_type': 'certificate', 'data': {'nom': 'certificat2', 'type': 'sans ogm'}})
+        self.assertEqual(response.data[0]['data']['nom'], 'product1')
+        # les champs inconnus ne créent pas de nouvelle entrée dans le cache
+        self.assertIn(
+            (CertificateSerializer, frozenset(['nom', 'type'])), CertificateSerializer._field_plans
+        )
+        self.assertNotIn('unknown', set().union(*(
+            requested for serializer_class, requested in CertificateSerializer._field_plans
+            if requested is not None
+        )))
+
+class TestBatchSearchProdCertifApi(APITestCase):
+    """
+    Test the api endpoint '/search-prod-certif-batch/'
+    """
+    def setUp(self):
+        """
+        Resume of the setup of the database:
+
+        farmer 1: certif 1 & product 1
+        farmer 2: certif 2 & products (1, 2)
+        farmer 3: same name as farmer 2, no certif, product 2
+        """
+        self.client = APIClient()
+        self.farmer_1 = Farmer.objects.create(
+            nom = 'farmer1',
+            numero_siret = 124119812876,
+            adresse = 'add1'
+        )
+        self.farmer_2 = Farmer.objects.create(
+            nom = 'farmer2',
+            numero_siret = 1234567654,
+            adresse = 'add2'
+        )
+        self.farmer_3 = Farmer.objects.create(
+            nom = 'farmer2',
+            numero_siret = 9876543210,
+            adresse = 'add3'
+        )
+        self.certificat_1 = Certificate.objects.create(
+            nom = 'certificate1',
+            type = 'biologique',
+            farmer_certifie = self.farmer_1
+        )
+        self.certificat_2 = Certificate.objects.create(
+            nom = 'certificat2',
+            type = 'sans ogm',
+            farmer_certifie = self.farmer_2
+        )
+        self.product_1 = Product.objects.create(
+            nom = 'product1',
+            unite = 4,
+            codification_internationnale = 'CI-423',
+        )
+        self.product_1.producteurs.add(self.farmer_1, self.farmer_2)
+        self.product_2 = Product.objects.create(
+            nom = 'product2',
+            unite = 34,
+            codification_internationnale = 'CI-4223413213',
+        )
+        self.product_2.producteurs.add(self.farmer_2, self.farmer_3)
+
+    def test_batch_search_group_by_farmer(self):
+        """
+        test GET '/search-prod-certif-batch/' return products & certificates grouped by farmer.
+        """
+        url = '/search-prod-certif-batch/'
+        response = self.client.get(url, {'nom': ['farmer1']})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, [{
+            'farmer': {'id': 1, 'url': 'http://testserver/farmer/1/', 'nom': 'farmer1', 'numero_siret': 124119812876, 'adresse': 'add1'},
+            'products': [{'id': 1, 'url': 'http://testserver/product/1/', 'nom': 'product1', 'unite': '4', 'codification_internationnale': 'CI-423', 'producteurs': [1, 2], 'intrants': []}],
+            'certificates': [{'id': 1, 'url': 'http://testserver/certificate/1/', 'nom': 'certificate1', 'type': 'biologique', 'farmer_certifie': 1, 'date_debut_validite': None, 'date_fin_validite': None}],
+        }])
+
+    def test_batch_search_disambiguate_homonyms(self):
+        """
+        test farmers sharing a name are returned separately, and can be selected by id or siret.
+        """
+        url = '/search-prod-certif-batch/'
+        response = self.client.get(url, {'nom': 'farmer2'})
+        self.assertEqual([group['farmer']['id'] for group in response.data], [2, 3])
+        self.assertEqual([p['id'] for p in response.data[1]['products']], [2])
+        self.assertEqual(response.data[1]['certificates'], [])
+
+        response = self.client.get(url, {'numero_siret': 9876543210})
+        self.assertEqual([group['farmer']['id'] for group in response.data], [3])
+        response = self.client.get(url, {'id': [1, 3]})
+        self.assertEqual([group['farmer']['id'] for group in response.data], [1, 3])
+
+    def test_batch_search_with_post(self):
+        """
+        test POST '/search-prod-certif-batch/' with a json body.
+        """
+        url = '/search-prod-certif-batch/'
+        response = self.client.post(url, {'nom': ['farmer1'], 'id': [3]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([group['farmer']['id'] for group in response.data], [1, 3])
+
+    def test_batch_search_fixed_number_of_queries(self):
+        """
+        test the number of queries does not depend on the number of farmers.
+        """
+        url = '/search-prod-certif-batch/'
+        with self.assertNumQueries(5):
+            self.client.get(url, {'id': [1]})
+        with self.assertNumQueries(5):
+            self.client.get(url, {'id': [1, 2, 3]})
+
+    def test_batch_search_with_incorrect_id(self):
+        """
+        test GET '/search-prod-certif-batch/' with a non integer id.
+        """
+        response = self.client.get('/search-prod-certif-batch/', {'id': 'abc'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/search-prod-certif-batch/', {'id': [1.7]}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_batch_search_post_repeated_form_values(self):
+        """
+        test POST a form with a repeated parameter keep all its values.
+        """
+        url = '/search-prod-certif-batch/'
+        response = self.client.post(url, {'nom': ['farmer1', 'farmer2']}, format='multipart')
+        self.assertEqual([group['farmer']['id'] for group in response.data], [1, 2, 3])
+        response = self.client.post(
+            url, 'nom=farmer1&nom=farmer2', content_type='application/x-www-form-urlencoded'
+        )
+        self.assertEqual([group['farmer']['id'] for group in response.data], [1, 2, 3])
+
+    def test_batch_search_post_not_an_object(self):
+        """
+        test POST a json body which is not an object is a '400 Bad Request'.
+        """
+        response = self.client.post('/search-prod-certif-batch/', [1, 2], format='json')
+        self.assertEqual(response.status_code, 400)
+
+class TestColumnarFormat(APITestCase):
+    """
+    Test the columnar format negotiated with 'Accept', '?format=' or the url suffix.
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.farmer_1 = Farmer.objects.create(
+            nom = 'farmer1',
+            numero_siret = 124119812876,
+            adresse = 'add1'
+        )
+        self.farmer_2 = Farmer.objects.create(
+            nom = 'farmer2',
+            numero_siret = 1234567654,
+            adresse = 'add2'
+        )
+        self.product_1 = Product.objects.create(
+            nom = 'product1',
+            unite = 'kg',
+            codification_internationnale = 'CI-423',
+        )
+        self.product_1.producteurs.add(self.farmer_1, self.farmer_2)
+        self.product_2 = Product.objects.create(
+            nom = 'product2',
+            unite = 'kg',
+            codification_internationnale = 'CI-4223413213',
+        )
+        self.product_2.producteurs.add(self.farmer_2)
+
+    def test_product_list_columnar(self):
+        """
+        test GET '/product/?format=columnar' return the products column by column.
+        """
+        response = self.client.get('/product/', {'format': 'columnar'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['content-type'], 'application/vnd.columnar+json')
+        self.assertEqual(response.json(), {
+            'count': 2,
+            'batches': [{
+                'count': 2,
+                'columns': {
+                    'id': [1, 2],
+                    'url': [
+                        'http://testserver/product/1/?format=columnar',
+                        'http://testserver/product/2/?format=columnar'
+                    ],
+                    'nom': ['product1', 'product2'],
+                    'unite': {'dictionary': ['kg'], 'indices': [0, 0]},
+                    'codification_internationnale': ['CI-423', 'CI-4223413213'],
+                    'producteurs': {'offsets': [0, 2, 3], 'values': [1, 2, 2]},
+                    'intrants': {'offsets': [0, 0, 0], 'values': []},
+                },
+            }],
+        })
+
+    def test_columnar_with_accept_header_and_suffix(self):
+        """
+        test the columnar format is also available with the header 'Accept' and the url suffix.
+        """
+        response = self.client.get('/farmer/', HTTP_ACCEPT='application/vnd.columnar+json')
+        self.assertEqual(response.json()['batches'][0]['columns']['nom'], ['farmer1', 'farmer2'])
+        response = self.client.get('/search-prod-certif.columnar', {'search': 'farmer1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 1)
+
+    def test_columnar_detail_is_plain_json(self):
+        """
+        test a detail view is rendered as plain json.
+        """
+        response = self.client.get('/farmer/1/', {'format': 'columnar'})
+        self.assertEqual(response.json()['nom'], 'farmer1')
@@ -0,0 +1,33 @@
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase
+
+from api.management.commands.loadtest import (HISTOGRAM_BOUNDS, histogram,
+                                              parse_mix, percentile)
+from api.management.helpers import make_siret
+from api.validators import validate_siret
+
+
+class TestLoadtestHelpers(SimpleTestCase):
+    """
+    Test the helpers of the command 'loadtest'.
+    """
+
+    def test_parse_mix(self):
+        self.assertEqual(
+            parse_mix('farmer-list=2,product-create'), {'farmer-list': 2, 'product-create': 1}
+        )
+        with self.assertRaises(CommandError):
+            parse_mix('unknown=1')
+        with self.assertRaises(CommandError):
+            parse_mix('farmer-list=abc')
+
+    def test_histogram_and_percentile(self):
+        counts = histogram([0.5, 1, 1.5, 30, 10000])
+        self.assertEqual(len(counts), len(HISTOGRAM_BOUNDS) + 1)
+        self.assertEqual((counts[0], counts[1], counts[5], counts[-1]), (2, 1, 1, 1))
+        self.assertEqual(percentile([1, 2, 3, 4], 0.5), 3)
+        self.assertEqual(percentile([], 0.5), 0.0)
+
+    def test_make_siret(self):
+        for number in (1, 42, 1234567890123):
+            validate_siret(make_siret(number))
@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.test import override_settings
+from rest_framework.test import APIClient, APITestCase
+
+from api_test_project import settings_api
+
+
+@override_settings(
+    MIDDLEWARE=settings_api.MIDDLEWARE,
+    ADMIN_MIDDLEWARE=settings_api.ADMIN_MIDDLEWARE,
+)
+class TestAdminOnlyMiddleware(APITestCase):
+    """
+    Test the middlewares of the api only settings.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_api_without_session(self):
+        """
+        test the api urls do not load a session.
+        """
+        response = self.client.get('/farmer/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(hasattr(response.wsgi_request, 'session'))
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+
+    def test_admin_still_working(self):
+        """
+        test the admin login page load a session and is protected against csrf.
+        """
+        response = self.client.get('/admin/login/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(hasattr(response.wsgi_request, 'session'))
+        self.assertIn(settings.CSRF_COOKIE_NAME, response.cookies)
+
+        client = APIClient(enforce_csrf_checks=True)
+        response = client.post('/admin/login/', {'username': 'a', 'password': 'b'}, format='multipart')
+        self.assertEqual(response.status_code, 403)
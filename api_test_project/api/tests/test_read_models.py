@@ -0,0 +1,74 @@
+import datetime
+import json
+
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory, APITestCase
+
+from api.models import Certificate, Farmer, Product
+from api.read_models import ReadModel
+from api.registry import siret_registry
+from api.serializers import CertificateSerializer, ProductSerializer
+
+
+class TestReadModels(APITestCase):
+    """
+    Test the lists and exports built from values_list rows instead of serializers.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        siret_registry.clear()
+        self.farmer_1 = Farmer.objects.create(nom = 'farmer1', numero_siret = 73282932000074, adresse = 'add1')
+        self.farmer_2 = Farmer.objects.create(nom = 'farmer2', numero_siret = 44306184100047, adresse = 'add2')
+        self.products = [
+            Product.objects.create(nom = f'product{i}', unite = 'kg', codification_internationnale = f'CI-{i}')
+            for i in range(5)
+        ]
+        for i, product in enumerate(self.products):
+            product.producteurs.add(*[self.farmer_1, self.farmer_2][:i % 3])
+            if i:
+                product.intrants.add(*self.products[:i][-2:])
+        Certificate.objects.create(
+            nom = 'certificate1', type = 'biologique', farmer_certifie = self.farmer_1,
+            date_debut_validite = datetime.date(2020, 1, 1), date_fin_validite = datetime.date(2020, 12, 31)
+        )
+        Certificate.objects.create(nom = 'certificate2', type = 'origine', farmer_certifie = self.farmer_2)
+        self.context = {
+            'request': Request(APIRequestFactory().get('/')),
+            'format': None,
+        }
+
+    def test_rows_equal_serializer_output(self):
+        """
+        test the read model rows are the serializer output, whatever the chunk size.
+        """
+        for serializer_class in (ProductSerializer, CertificateSerializer):
+            queryset = serializer_class.Meta.model.objects.order_by('pk')
+            expected = serializer_class(queryset, many=True, context=self.context).data
+            for chunk_size in (1, 2, 100):
+                read_model = ReadModel(serializer_class(context=self.context), chunk_size=chunk_size)
+                self.assertEqual(list(read_model.rows(queryset)), expected)
+
+    def test_list_queries_per_chunk(self):
+        """
+        test the product list reads the rows and the links of each chunk, not of each row.
+        """
+        with self.assertNumQueries(3):
+            response = self.client.get('/product/')
+        self.assertEqual(len(response.data), 5)
+
+    def test_export(self):
+        """
+        test GET '/<model>/export/' stream the filtered rows as json lines.
+        """
+        response = self.client.get('/certificate/export/', {'search': 'farmer1', 'fields': 'nom,date_fin_validite'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['content-type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(
+            [json.loads(line) for line in lines],
+            [{'nom': 'certificate1', 'date_fin_validite': '2020-12-31'}]
+        )
+        response = self.client.get('/product/export/')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(rows, self.client.get('/product/').json())
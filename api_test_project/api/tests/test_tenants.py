@@ -0,0 +1,202 @@
+from unittest import skipUnless
+
+from django.conf import settings
+from django.test import override_settings
+from rest_framework.test import APIClient, APITestCase
+
+from api.db_routers import TenantRouter
+from api.models import Certificate, Cooperative, Farmer, Product
+from api.registry import siret_registry
+
+
+class TestCooperativeScoping(APITestCase):
+    """
+    Test the endpoints are scoped to the cooperative of the header 'X-Cooperative'.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        siret_registry.clear()
+        self.coop_1 = Cooperative.objects.create(nom='coop1', slug='coop1')
+        self.coop_2 = Cooperative.objects.create(nom='coop2', slug='coop2')
+        self.farmer_1 = Farmer.objects.create(
+            nom = 'farmer', numero_siret = 73282932000074, adresse = 'add1', cooperative = self.coop_1
+        )
+        self.farmer_2 = Farmer.objects.create(
+            nom = 'farmer', numero_siret = 44306184100047, adresse = 'add2', cooperative = self.coop_2
+        )
+        self.product_1 = Product.objects.create(
+            nom = 'product1', unite = 'kg', codification_internationnale = 'CI-1', cooperative = self.coop_1
+        )
+        self.product_1.producteurs.add(self.farmer_1)
+        self.certificat_2 = Certificate.objects.create(
+            nom = 'certificat2', type = 'biologique', farmer_certifie = self.farmer_2, cooperative = self.coop_2
+        )
+
+    def test_list_scoped_to_cooperative(self):
+        """
+        test GET list return only the rows of the cooperative, the rows of no cooperative without header.
+        """
+        response = self.client.get('/farmer/', HTTP_X_COOPERATIVE='coop1')
+        self.assertEqual([farmer['id'] for farmer in response.data], [self.farmer_1.pk])
+        response = self.client.get('/certificate/', HTTP_X_COOPERATIVE='coop1')
+        self.assertEqual(response.data, [])
+        response = self.client.get(f'/certificate/{self.certificat_2.pk}/', HTTP_X_COOPERATIVE='coop1')
+        self.assertEqual(response.status_code, 404)
+        farmer_3 = Farmer.objects.create(nom = 'farmer', numero_siret = 12345678000113, adresse = 'add3')
+        response = self.client.get('/farmer/')
+        self.assertEqual([farmer['id'] for farmer in response.data], [farmer_3.pk])
+        response = self.client.get('/farmer/by-siret/73282932000074/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_header_required(self):
+        """
+        test the requests without header are refused with TENANT_HEADER_REQUIRED.
+        """
+        with override_settings(TENANT_HEADER_REQUIRED=True):
+            response = self.client.get('/farmer/')
+            self.assertEqual(response.status_code, 403)
+            response = self.client.get('/search-prod-certif/', {'search': 'farmer'})
+            self.assertEqual(response.status_code, 403)
+            response = self.client.get('/farmer/', HTTP_X_COOPERATIVE='coop1')
+            self.assertEqual(response.status_code, 200)
+
+    def test_unknown_cooperative_not_cached(self):
+        """
+        test a cooperative unknown at a first request is found once created.
+        """
+        response = self.client.get('/farmer/', HTTP_X_COOPERATIVE='coop3')
+        self.assertEqual(response.status_code, 404)
+        # créée par un autre worker: pas de signal dans ce processus
+        Cooperative.objects.bulk_create([Cooperative(nom='coop3', slug='coop3')])
+        response = self.client.get('/farmer/', HTTP_X_COOPERATIVE='coop3')
+        self.assertEqual(response.status_code, 200)
+
+    def test_unknown_cooperative(self):
+        """
+        test an unknown cooperative in the header return a 404.
+        """
+        response = self.client.get('/farmer/', HTTP_X_COOPERATIVE='unknown')
+        self.assertEqual(response.status_code, 404)
+
+    def test_create_attached_to_cooperative(self):
+        """
+        test POST attach the new instance to the cooperative, and refuse the farmers of the others.
+        """
+        url = '/product/'
+        payload = {
+            'nom' : 'product2',
+            'unite' : 'kg',
+            'codification_internationnale' : 'CI-2',
+            'producteurs': [self.farmer_1.pk]
+        }
+        response = self.client.post(url, payload, HTTP_X_COOPERATIVE='coop1')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Product.objects.get(pk=response.data['id']).cooperative, self.coop_1)
+
+        payload['producteurs'] = [self.farmer_2.pk]
+        response = self.client.post(url, payload, HTTP_X_COOPERATIVE='coop1')
+        self.assertEqual(response.status_code, 400)
+
+    def test_search_and_siret_scoped_to_cooperative(self):
+        """
+        test the search endpoints and the siret lookup are scoped to the cooperative.
+        """
+        response = self.client.get('/search-prod-certif/', {'search': 'farmer'}, HTTP_X_COOPERATIVE='coop2')
+        self.assertEqual([item['item_type'] for item in response.data], ['certificate'])
+        response = self.client.get('/search-prod-certif-batch/', {'nom': 'farmer'}, HTTP_X_COOPERATIVE='coop1')
+        self.assertEqual([group['farmer']['id'] for group in response.data], [self.farmer_1.pk])
+        response = self.client.get('/farmer/by-siret/44306184100047/', HTTP_X_COOPERATIVE='coop1')
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get('/farmer/by-siret/44306184100047/', HTTP_X_COOPERATIVE='coop2')
+        self.assertEqual(response.data['id'], self.farmer_2.pk)
+
+    def test_router_place_cooperative_on_its_database(self):
+        """
+        test the database router send the instances of a cooperative to its database.
+        """
+        router = TenantRouter()
+        self.assertIsNone(router.db_for_write(Farmer, instance=self.farmer_2))
+        with override_settings(TENANT_DATABASES={'coop2': 'coop2_db'}):
+            self.assertEqual(router.db_for_write(Farmer, instance=self.farmer_2), 'coop2_db')
+            self.assertEqual(router.db_for_read(Certificate, instance=self.certificat_2), 'coop2_db')
+            self.assertIsNone(router.db_for_read(Farmer, instance=self.farmer_1))
+            self.assertEqual(router.db_for_read(Cooperative, instance=self.coop_2), 'default')
+            self.assertEqual(router.db_for_write(Farmer, instance=self.coop_2), 'coop2_db')
+            self.assertTrue(router.allow_relation(self.coop_2, self.farmer_2))
+
+
+@skipUnless('cooperative' in settings.DATABASES, "needs the database 'cooperative' of settings_test.py")
+@override_settings(TENANT_DATABASES={'coop2': 'cooperative'})
+class TestCooperativeDatabase(APITestCase):
+    """
+    Test the writes of a cooperative listed in TENANT_DATABASES go to its database.
+    """
+    databases = {'default', 'cooperative'}
+
+    def setUp(self):
+        self.client = APIClient()
+        siret_registry.clear()
+        self.coop_2 = Cooperative.objects.create(nom='coop2', slug='coop2')
+        self.farmer_2 = Farmer.objects.db_manager('cooperative').create(
+            nom = 'farmer2', numero_siret = 44306184100047, adresse = 'add2', cooperative = self.coop_2
+        )
+
+    def test_router_on_cooperative_database(self):
+        """
+        test the saves and the related lookups of an instance of the cooperative use its database.
+        """
+        farmer = Farmer.objects.using('cooperative').get(pk=self.farmer_2.pk)
+        farmer.adresse = 'add3'
+        farmer.save()
+        self.assertEqual(Farmer.objects.using('cooperative').get(pk=farmer.pk).adresse, 'add3')
+        self.assertFalse(Farmer.objects.using('default').exists())
+        # la coopérative est lue sur la base par défaut
+        self.assertEqual(farmer.cooperative, self.coop_2)
+        self.assertEqual(farmer.cooperative._state.db, 'default')
+
+    def test_create_on_cooperative_database(self):
+        """
+        test POST create the instance and its links on the database of the cooperative.
+        """
+        response = self.client.post('/farmer/', {
+            'nom': 'farmer3', 'numero_siret': 12345678000113, 'adresse': 'add3'
+        }, HTTP_X_COOPERATIVE='coop2')
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(Farmer.objects.using('default').filter(nom='farmer3').exists())
+        farmer_3 = Farmer.objects.using('cooperative').get(nom='farmer3')
+        self.assertEqual(farmer_3.cooperative, self.coop_2)
+        response = self.client.get(f'/farmer/{farmer_3.pk}/', HTTP_X_COOPERATIVE='coop2')
+        self.assertEqual(response.data['nom'], 'farmer3')
+
+        response = self.client.post('/product/', {
+            'nom': 'product', 'unite': 'kg', 'codification_internationnale': 'CI-1',
+            'producteurs': [self.farmer_2.pk, farmer_3.pk]
+        }, format='json', HTTP_X_COOPERATIVE='coop2')
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(Product.objects.using('default').exists())
+        product = Product.objects.using('cooperative').get(pk=response.data['id'])
+        self.assertEqual(
+            sorted(farmer.pk for farmer in product.producteurs.all()), [self.farmer_2.pk, farmer_3.pk]
+        )
+
+        response = self.client.post('/certificate/', {
+            'nom': 'bio', 'type': 'biologique', 'farmer_certifie': farmer_3.pk
+        }, HTTP_X_COOPERATIVE='coop2')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Certificate.objects.using('cooperative').filter(farmer_certifie=farmer_3).exists())
+
+    def test_unique_siret_on_cooperative_database(self):
+        """
+        test the unique siret number is checked on the database of the cooperative.
+        """
+        response = self.client.post('/farmer/', {
+            'nom': 'farmer3', 'numero_siret': 44306184100047, 'adresse': 'add3'
+        }, HTTP_X_COOPERATIVE='coop2')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('numero_siret', response.data)
+        # sans en-tête, la base par défaut ne connaît pas ce siret
+        response = self.client.post('/farmer/', {
+            'nom': 'farmer3', 'numero_siret': 44306184100047, 'adresse': 'add3'
+        })
+        self.assertEqual(response.status_code, 201)
@@ -0,0 +1,136 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.test import Client
+from rest_framework import serializers
+from rest_framework.test import APIClient, APITestCase
+
+from api.models import Certificate, Farmer, Product
+from api.registry import siret_registry
+from api.serializers import ProductSerializer
+from api.traceability import upstream_product_ids
+
+
+class TestProductTraceability(APITestCase):
+    """
+    Test the upstream products ('intrants') and the endpoint '/product/<id>/traceability/'.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        siret_registry.clear()
+        self.farmer_1 = Farmer.objects.create(nom = 'farmer1', numero_siret = 73282932000074, adresse = 'add1')
+        self.farmer_2 = Farmer.objects.create(nom = 'farmer2', numero_siret = 44306184100047, adresse = 'add2')
+        self.farmer_3 = Farmer.objects.create(nom = 'farmer3', numero_siret = 12345678000113, adresse = 'add3')
+        # ble (farmer1) -> farine (farmer2) -> pain, lait (farmer3) -> pain, farine
+        self.ble = Product.objects.create(nom = 'ble', unite = 'kg', codification_internationnale = 'CI-1')
+        self.farine = Product.objects.create(nom = 'farine', unite = 'kg', codification_internationnale = 'CI-2')
+        self.lait = Product.objects.create(nom = 'lait', unite = 'l', codification_internationnale = 'CI-3')
+        self.pain = Product.objects.create(nom = 'pain', unite = 'kg', codification_internationnale = 'CI-4')
+        self.ble.producteurs.add(self.farmer_1)
+        self.farine.producteurs.add(self.farmer_2)
+        self.lait.producteurs.add(self.farmer_3)
+        self.farine.intrants.add(self.ble, self.lait)
+        self.pain.intrants.add(self.farine, self.lait)
+        self.certificate_1 = Certificate.objects.create(
+            nom = 'bio1', type = 'biologique', farmer_certifie = self.farmer_1,
+            date_fin_validite = datetime.date(2020, 12, 31)
+        )
+        self.certificate_3 = Certificate.objects.create(
+            nom = 'origine3', type = 'origine', farmer_certifie = self.farmer_3
+        )
+
+    def test_upstream_product_ids(self):
+        """
+        test the recursive query walk all the upstream products, once each.
+        """
+        self.assertEqual(
+            upstream_product_ids([self.pain.pk]),
+            {self.pain.pk, self.farine.pk, self.lait.pk, self.ble.pk}
+        )
+        self.assertEqual(upstream_product_ids([self.ble.pk]), {self.ble.pk})
+
+    def test_traceability(self):
+        """
+        test GET '/product/<id>/traceability/' return the upstream farmers with their certificates.
+        """
+        with self.assertNumQueries(5):
+            response = self.client.get(f'/product/{self.pain.pk}/traceability/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['product']['intrants'], [self.farine.pk, self.lait.pk])
+        self.assertEqual(
+            [(group['farmer']['id'], [c['id'] for c in group['certificates']]) for group in response.data['farmers']],
+            [
+                (self.farmer_1.pk, [self.certificate_1.pk]),
+                (self.farmer_2.pk, []),
+                (self.farmer_3.pk, [self.certificate_3.pk]),
+            ]
+        )
+
+    def test_traceability_certificates_valid_at_date(self):
+        """
+        test '?at=' keep only the certificates valid at that date.
+        """
+        response = self.client.get(f'/product/{self.pain.pk}/traceability/', {'at': '2021-01-01'})
+        self.assertEqual(
+            [[c['id'] for c in group['certificates']] for group in response.data['farmers']],
+            [[], [], [self.certificate_3.pk]]
+        )
+
+    def test_update_intrants(self):
+        """
+        test PATCH the intrants of a product.
+        """
+        response = self.client.patch(
+            f'/product/{self.farine.pk}/', {'intrants': [self.ble.pk]}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['intrants'], [self.ble.pk])
+        self.assertEqual(list(self.farine.intrants.all()), [self.ble])
+
+    def test_update_intrants_refuse_cycle(self):
+        """
+        test a product cannot be upstream of itself, directly or not.
+        """
+        for product, intrants in ((self.farine, [self.pain.pk]), (self.ble, [self.ble.pk])):
+            response = self.client.patch(f'/product/{product.pk}/', {'intrants': intrants}, format='json')
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('intrants', response.data)
+
+    def test_admin_form_refuse_cycle(self):
+        """
+        test the admin form of a product refuse an intrant downstream of it.
+        """
+        client = Client()
+        client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        response = client.post(f'/admin/api/product/{self.ble.pk}/change/', {
+            'nom': 'ble', 'unite': 'kg', 'codification_internationnale': 'CI-1',
+            'producteurs': str(self.farmer_1.pk), 'intrants': str(self.pain.pk),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('intrants', response.context['adminform'].form.errors)
+        self.assertEqual(list(self.ble.intrants.all()), [])
+
+    def test_orm_writes_refuse_cycle(self):
+        """
+        test adding a cycle with the ORM, in both directions, is refused.
+        """
+        with self.assertRaises(ValidationError), transaction.atomic():
+            self.ble.intrants.add(self.pain)
+        with self.assertRaises(ValidationError), transaction.atomic():
+            self.pain.produits_derives.add(self.ble)
+        self.assertEqual(list(self.ble.intrants.all()), [])
+
+    def test_update_intrants_checked_again_on_write(self):
+        """
+        test a link written by another request after the validation is seen on write.
+        """
+        serializer = ProductSerializer(self.ble, data={'intrants': [self.lait.pk]}, partial=True)
+        self.assertTrue(serializer.is_valid())
+        # lait <- ble, écrit entre la validation et l'écriture
+        Product.intrants.through.objects.create(from_product=self.lait, to_product=self.ble)
+        with self.assertRaises(serializers.ValidationError), transaction.atomic():
+            serializer.save()
+        self.assertEqual(list(self.ble.intrants.all()), [])
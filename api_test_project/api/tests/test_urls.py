@@ -1,5 +1,9 @@
-from django.urls import resolve
-from rest_framework.test import APITestCase
+from django.urls import get_resolver, resolve, set_script_prefix
+from rest_framework.request import Request
+from rest_framework.reverse import reverse
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from api.hyperlinks import detail_url_builder
 
 class TestUrls(APITestCase):
 
@@ -12,8 +16,48 @@ class TestUrls(APITestCase):
         # Test name linked to url
         self.assertEqual(resolve('/farmer/').view_name, 'farmer-list')
         self.assertEqual(resolve('/farmer/2/').view_name, 'farmer-detail')
+        self.assertEqual(
+            resolve('/farmer/by-siret/73282932000074/').view_name, 'farmer-by-siret'
+        )
         self.assertEqual(resolve('/product/').view_name, 'product-list')
         self.assertEqual(resolve('/product/2/').view_name, 'product-detail')
         self.assertEqual(resolve('/certificate/').view_name, 'certificate-list')
         self.assertEqual(resolve('/certificate/2/').view_name, 'certificate-detail')
-        self.assertEqual(resolve('/search-prod-certif/').view_name, 'search-prod-certif-list')
\ No newline at end of file
+        self.assertEqual(resolve('/search-prod-certif/').view_name, 'search-prod-certif-list')
+        self.assertEqual(
+            resolve('/search-prod-certif-batch/').view_name,
+            'search-prod-certif-batch-list'
+        )
+
+class TestDetailURLBuilder(APITestCase):
+
+    def setUp(self):
+        # charge les urls, et le router qui renseigne detail_url_builder
+        get_resolver().url_patterns
+
+    def test_builder_match_reverse(self):
+        """
+            Check the url builder return exactly the same urls
+            as the `reverse` function of rest framework.
+        """
+        self.assertIn('certificate-detail', detail_url_builder.view_names)
+        django_request = APIRequestFactory().get('/', {'format': 'json'})
+        request = Request(django_request)
+        for view_name in ('farmer-detail', 'product-detail', 'certificate-detail'):
+            for pk in (1, 42, 123456789):
+                for req, format in ((None, None), (request, None), (request, 'json')):
+                    self.assertEqual(
+                        detail_url_builder.reverse(view_name, pk, req, format),
+                        reverse(view_name, kwargs={'pk': pk}, request=req, format=format)
+                    )
+
+    def test_builder_with_script_prefix(self):
+        """
+            Check the script prefix is taken at each call, not with the template.
+        """
+        detail_url_builder.reverse('farmer-detail', 1)
+        set_script_prefix('/api/')
+        try:
+            self.assertEqual(detail_url_builder.reverse('farmer-detail', 1), '/api/farmer/1/')
+        finally:
+            set_script_prefix('/')
@@ -0,0 +1,88 @@
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models.expressions import RawSQL
+
+from .models import Product
+
+# clé du verrou consultatif des écritures de 'intrants' (PostgreSQL)
+INTRANTS_LOCK_KEY = 38001
+
+
+class RawSubquery(RawSQL):
+    """
+        `RawSQL` used as the right hand side of '__in', without the parentheses
+        of `RawSQL`: the lookup adds its own, and SQLite reads '((SELECT ...))'
+        as a scalar sub-query returning only the first row.
+    """
+
+    def as_sql(self, compiler, connection):
+        return self.sql, self.params
+
+
+def upstream_cte(product_ids):
+    """
+        Return the (sql, params) of the recursive CTE 'amont(id)' listing the
+        products `product_ids` and all the products upstream of them, walking
+        the 'intrants' links. UNION drops the duplicates, so a product reached
+        by several paths is visited once.
+    """
+    field = Product._meta.get_field('intrants')
+    placeholders = ', '.join(['%s'] * len(product_ids))
+    sql = (
+        f'WITH RECURSIVE amont(id) AS ('
+        f'SELECT id FROM {Product._meta.db_table} WHERE id IN ({placeholders}) '
+        f'UNION '
+        f'SELECT i.{field.m2m_reverse_name()} FROM {field.m2m_db_table()} i '
+        f'INNER JOIN amont ON i.{field.m2m_column_name()} = amont.id'
+        f')'
+    )
+    return sql, list(product_ids)
+
+
+def upstream_product_ids(product_ids, using='default'):
+    """
+        Return the set of the products `product_ids` and their upstream products, in one query.
+    """
+    if not product_ids:
+        return set()
+    sql, params = upstream_cte(product_ids)
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'{sql} SELECT id FROM amont', params)
+        return {row[0] for row in cursor.fetchall()}
+
+
+def lock_intrants(using='default'):
+    """
+        Serialize the writes of the 'intrants' links until the end of the current
+        transaction, so that two concurrent writes cannot each close half of a cycle:
+        an advisory lock on PostgreSQL, SQLite already has only one writer at a time.
+    """
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', [INTRANTS_LOCK_KEY])
+
+
+def check_intrants(product_pk, intrant_pks, using='default'):
+    """
+        Raise a ValidationError if the products `intrant_pks` cannot be upstream
+        of the product `product_pk`: the product would be upstream of itself.
+        Call `lock_intrants` first in the write transaction to check the
+        committed links of the other writes.
+    """
+    if product_pk is not None and product_pk in upstream_product_ids(list(intrant_pks), using):
+        raise ValidationError('A product cannot be upstream of itself.', code='cycle')
+
+
+def upstream_farmer_ids(product_ids):
+    """
+        Return the sub-query of the producteurs of the products `product_ids` and of
+        their upstream products, to filter the farmers: 'pk__in=upstream_farmer_ids(...)'.
+    """
+    sql, params = upstream_cte(product_ids)
+    field = Product._meta.get_field('producteurs')
+    return RawSubquery(
+        f'{sql} SELECT p.{field.m2m_reverse_name()} FROM {field.m2m_db_table()} p '
+        f'INNER JOIN amont ON p.{field.m2m_column_name()} = amont.id',
+        params
+    )
@@ -4,6 +4,8 @@ from rest_framework import routers, viewsets
 from rest_framework.urlpatterns import format_suffix_patterns
 
 from . import views
+from .hyperlinks import detail_url_builder
+from .renderers import ColumnarJSONRenderer
 
 
 class DefaultRouterWithSimpleViews(routers.DefaultRouter):
@@ -32,8 +34,9 @@ class DefaultRouterWithSimpleViews(routers.DefaultRouter):
         ret = []
         for prefix, viewset, basename in self.registry:
 
-            # Skip viewsets
+            # Skip viewsets, their detail urls are served by the url builder of the serializers
             if issubclass(viewset, viewsets.ViewSetMixin):
+                detail_url_builder.register('{0}-detail'.format(basename))
                 continue
 
             # URL regex
@@ -50,7 +53,9 @@ class DefaultRouterWithSimpleViews(routers.DefaultRouter):
             ))
 
         # Format suffixes
-        ret = format_suffix_patterns(ret, allowed=['json', 'html'])
+        ret = format_suffix_patterns(
+            ret, allowed=['json', 'html', ColumnarJSONRenderer.format]
+        )
 
         # Prepend URLs for viewsets and return
         return super(DefaultRouterWithSimpleViews, self).get_urls() + ret
@@ -61,6 +66,11 @@ router.register('farmer', views.FarmerView)
 router.register('product', views.ProductView)
 router.register('certificate', views.CertificateView)
 router.register('search-prod-certif', views.ProdAndCertifView, basename='search-prod-certif')
+router.register(
+    'search-prod-certif-batch',
+    views.BatchProdAndCertifView,
+    basename='search-prod-certif-batch'
+)
 
 urlpatterns = [
     path('', include(router.urls)),  
@@ -0,0 +1,33 @@
+from django.core.exceptions import ValidationError
+
+# SIREN de La Poste, dont les SIRET ne respectent pas tous la clé de Luhn
+LA_POSTE_SIREN = '356000000'
+
+
+def luhn_checksum_is_valid(number):
+    total = 0
+    for position, digit in enumerate(reversed(number)):
+        digit = int(digit)
+        if position % 2:
+            digit *= 2
+            if digit > 9:
+                digit -= 9
+        total += digit
+    return total % 10 == 0
+
+
+def validate_siret(value):
+    """
+        Check the value is a siret number: 14 digits (9 siren + 5 NIC)
+        with a valid Luhn checksum. Leading zeros are not stored in the
+        integer column, they are added back before the checksum.
+    """
+    if value is None or not 0 < value < 10 ** 14:
+        raise ValidationError('A siret number has 14 digits.', code='invalid_siret')
+    siret = str(value).zfill(14)
+    if luhn_checksum_is_valid(siret):
+        return
+    # les établissements de La Poste utilisent la somme des chiffres modulo 5
+    if siret.startswith(LA_POSTE_SIREN) and sum(int(digit) for digit in siret) % 5 == 0:
+        return
+    raise ValidationError('Invalid siret number checksum.', code='invalid_siret')
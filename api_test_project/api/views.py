@@ -1,67 +1,255 @@
-from itertools import chain
+from collections import defaultdict
 
-from rest_framework import filters, generics, views, viewsets
+from django.conf import settings
+from django.db.models import Prefetch, Q
+from django.http import Http404, QueryDict
+from rest_framework import filters, generics, status, views, viewsets
+from rest_framework.decorators import action
 from rest_framework.response import Response
 
-from .models import Certificate, Farmer, Product
-from .serializers import (CertificateSerializer, FarmerSerializer,
+from .certifications import certified_farmer_counts, reads_archive, valid_at
+from .filters import CertifiedFilter, get_date_param
+from .models import ArchivedCertificate, Certificate, Farmer, Product
+from .read_models import ReadModelMixin
+from .registry import siret_registry
+from .tenants import (TenantScopedMixin, get_request_cooperative,
+                      scope_queryset, tenant_db_alias)
+from .serializers import (ArchivedCertificateSerializer, BatchLookupSerializer,
+                          CertificateSerializer, FarmerSerializer,
                           ProductSerializer)
+from .tasks import delete_farmer, run_in_background
+from .traceability import upstream_farmer_ids
 
 
-class FarmerView(viewsets.ModelViewSet):
+class FarmerView(TenantScopedMixin, ReadModelMixin, viewsets.ModelViewSet):
     """
         This view show the Farmer list or instance recorded in database.
     """
     serializer_class = FarmerSerializer
     queryset = Farmer.objects.all()
+    filter_backends = [CertifiedFilter]
     
     # si la permission n'est pas ajouté dans le setting du projet
     # permission_classes = (permissions.IsAuthenticatedOrReadOnly,)
 
-class ProductView(viewsets.ModelViewSet):
+    def destroy(self, request, *args, **kwargs):
+        """
+            The certificates and product links of the farmer are deleted by chunks.
+            For a farmer with more certificates than `settings.FARMER_DELETE_CHUNK_SIZE`
+            the deletion runs in the background and the response is '202 Accepted'.
+        """
+        farmer = self.get_object()
+        chunk_size = settings.FARMER_DELETE_CHUNK_SIZE
+        using = farmer._state.db
+        if Certificate.objects.using(using).filter(farmer_certifie=farmer).count() > chunk_size:
+            run_in_background(delete_farmer, farmer.pk, chunk_size, using=using)
+            return Response(status=status.HTTP_202_ACCEPTED)
+        delete_farmer(farmer.pk, chunk_size, using=using)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=False, url_path=r'by-siret/(?P<siret>[0-9]{1,14})')
+    def by_siret(self, request, siret, format=None):
+        """
+            Return the farmer with this siret number: 'GET /farmer/by-siret/<siret>/'
+        """
+        cooperative = get_request_cooperative(request)
+        cooperative_id = cooperative.pk if cooperative is not None else None
+        using = tenant_db_alias(cooperative_id) or 'default'
+        farmer = siret_registry.get(int(siret), using)
+        # comme scope_queryset: sans en-tête, seulement les farmers sans coopérative
+        if farmer is None or farmer.cooperative_id != cooperative_id:
+            raise Http404
+        serializer = self.get_serializer(farmer)
+        return Response(serializer.data)
+
+    @action(detail=False, url_path='certified-counts')
+    def certified_counts(self, request, format=None):
+        """
+            Return the number of certified farmers for each certificate type,
+            at the date 'at' or today: 'GET /farmer/certified-counts/?at=2020-01-31'
+        """
+        cooperative = get_request_cooperative(request)
+        return Response(certified_farmer_counts(
+            self.get_queryset(),
+            get_date_param(request),
+            scope=cooperative.pk if cooperative is not None else None
+        ))
+
+class ProductView(TenantScopedMixin, ReadModelMixin, viewsets.ModelViewSet):
     """
         This view show the Product list or instance recorded in database.
     """
     serializer_class = ProductSerializer
     queryset = Product.objects.all()
+
+    @action(detail=True)
+    def traceability(self, request, pk=None, format=None):
+        """
+            Return the farmers of the product and of all its upstream products
+            ('intrants', at any depth) with their certificates:
+            'GET /product/<id>/traceability/', add '?at=2020-01-31' to keep
+            only the certificates valid at that date, archived ones included.
+            The supply chain is walked by one recursive query.
+        """
+        product = self.get_object()
+        certificates = scope_queryset(Certificate.active.all(), request)
+        date = get_date_param(request) if 'at' in request.query_params else None
+        if date is not None:
+            certificates = certificates.filter(valid_at(date))
+        farmers = scope_queryset(
+            Farmer.objects.using(product._state.db).filter(pk__in=upstream_farmer_ids([product.pk])),
+            request
+        ).order_by('id').prefetch_related(Prefetch('certificate_set', queryset=certificates))
+
+        context = self.get_serializer_context()
+        farmers = list(farmers)
+        farmers_data = FarmerSerializer(farmers, many=True, context=context).data
+        archived = defaultdict(list)
+        if date is not None and reads_archive(date):
+            # les farmers sont déjà filtrés par coopérative
+            for certificate in ArchivedCertificate.objects.using(product._state.db).filter(
+                valid_at(date), date_suppression__isnull=True,
+                farmer_certifie_id__in=[farmer.pk for farmer in farmers]
+            ).order_by('certificate_id'):
+                archived[certificate.farmer_certifie_id].append(certificate)
+        return Response({
+            'product': self.get_serializer(product).data,
+            'farmers': [
+                {
+                    'farmer': farmer_data,
+                    'certificates': CertificateSerializer(
+                        farmer.certificate_set.all(), many=True, context=context
+                    ).data + ArchivedCertificateSerializer(archived[farmer.pk], many=True).data,
+                }
+                for farmer, farmer_data in zip(farmers, farmers_data)
+            ],
+        })
     
        
-class CertificateView(viewsets.ModelViewSet):
+class CertificateView(TenantScopedMixin, ReadModelMixin, viewsets.ModelViewSet):
     """
         This view show the Certificate list or instance recorded in database.
         If you want you can search by farmer's name with the 'filtrer' button,
         It will return the certificate related to the farmer.
     """
     serializer_class = CertificateSerializer
-    queryset = Certificate.objects.all()
+    queryset = Certificate.active.all()
     filter_backends = [filters.SearchFilter]
     search_fields = ['farmer_certifie__nom']
 
+    def perform_destroy(self, instance):
+        # suppression logique, le certificat est archivé plus tard
+        instance.soft_delete()
+
 class ProdAndCertifView(views.APIView):
     """
         This end point aggregate data, it return the products & certificates associated to a farmer name.
         Use the parameter 'search' like this 'GET /search-prod-certif/?search=searched_farmer_name'
     """
     # ovverride the get_queryset method
-    def get(self, request):
+    def get(self, request, format=None):
         # Custom queries
         farmer_name = request.query_params.get('search', None)
-        queryset_product = Product.objects.filter(producteurs__nom=farmer_name)
-        queryset_certificate = Certificate.objects.filter(
+        queryset_product = scope_queryset(Product.objects.filter(
+            producteurs__nom=farmer_name
+        ).prefetch_related('producteurs', 'intrants'), request)
+        queryset_certificate = scope_queryset(Certificate.active.filter(
             farmer_certifie__nom=farmer_name
+        ), request)
+        # One serializer per type, its fields are built once for all the rows.
+        context = {'request': request}
+        results = list()
+        for item_type, serializer in (
+            ('product', ProductSerializer(queryset_product, many=True, context=context)),
+            ('certificate', CertificateSerializer(queryset_certificate, many=True, context=context)),
+        ):
+            results.extend({'item_type': item_type, 'data': data} for data in serializer.data)
+
+        return Response(results)
+
+
+class BatchProdAndCertifView(views.APIView):
+    """
+        Batch version of 'search-prod-certif': return the products & certificates
+        grouped by farmer, for many farmers in one call.
+        Farmers are selected by name, id or siret number, with repeated parameters:
+        'GET /search-prod-certif-batch/?nom=farmer1&nom=farmer2&id=3&numero_siret=12345678901234'
+        or with a POST body like '{"nom": ["farmer1"], "id": [3], "numero_siret": []}'.
+        Farmers sharing a name are returned as separate groups, each one with its id
+        and siret number. The number of queries does not depend on the batch size.
+    """
+    lookup_params = ('nom', 'id', 'numero_siret')
+    max_batch_size = 500
+
+    def get(self, request, format=None):
+        return self.batch_response(request, request.query_params)
+
+    def post(self, request, format=None):
+        data = request.data
+        # formulaire: QueryDict, lu avec getlist
+        if not isinstance(data, QueryDict):
+            if not isinstance(data, dict):
+                return Response(
+                    {'detail': 'Expected an object of lists like {"nom": [...], "id": [...]}.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            # json: une valeur seule vaut une liste d'un élément
+            data = {
+                param: value if isinstance(value, list) else [value]
+                for param, value in data.items()
+                if param in self.lookup_params
+            }
+        return self.batch_response(request, data)
+
+    def batch_response(self, request, data):
+        lookups = BatchLookupSerializer(data=data)
+        lookups.is_valid(raise_exception=True)
+        lookups = lookups.validated_data
+        size = sum(len(values) for values in lookups.values())
+        if size > self.max_batch_size:
+            return Response(
+                {'detail': f'Too many farmers requested ({size} > {self.max_batch_size}).'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        ids = lookups['id']
+        sirets = lookups['numero_siret']
+
+        # une seule requête pour les farmers, puis une par relation prefetchée
+        condition = Q(nom__in=lookups['nom']) | Q(id__in=ids) | Q(numero_siret__in=sirets)
+        farmers = scope_queryset(Farmer.objects.filter(condition), request)
+        farmers = farmers.order_by('id').prefetch_related(
+            Prefetch(
+                'product_set',
+                queryset=scope_queryset(Product.objects.prefetch_related('producteurs', 'intrants'), request)
+            ),
+            Prefetch('certificate_set', queryset=scope_queryset(Certificate.active.all(), request)),
         )
-        # Create an iterator for the querysets and turn it into a list.
-        results_list = list(chain(queryset_product, queryset_certificate))
 
-        # Build the serialized list of products and certificates from farmer name.
+        # Each product or certificate is serialized once, even if shared by several farmers.
+        farmers = list(farmers)
+        products = dict()
+        certificates = dict()
+        for farmer in farmers:
+            products.update((product.pk, product) for product in farmer.product_set.all())
+            certificates.update((certif.pk, certif) for certif in farmer.certificate_set.all())
+        context = {'request': request}
+        products_data = dict(zip(
+            products,
+            ProductSerializer(list(products.values()), many=True, context=context).data
+        ))
+        certificates_data = dict(zip(
+            certificates,
+            CertificateSerializer(list(certificates.values()), many=True, context=context).data
+        ))
+
+        farmers_data = FarmerSerializer(farmers, many=True, context=context).data
+
         results = list()
-        for entry in results_list:
-            item_type = entry.__class__.__name__.lower()
-            if isinstance(entry, Product):
-                serializer = ProductSerializer(entry, context={'request': request})
-            if isinstance(entry, Certificate):
-                serializer = CertificateSerializer(entry, context={'request': request})
-            
-            results.append({'item_type': item_type, 'data': serializer.data})
+        for farmer, farmer_data in zip(farmers, farmers_data):
+            results.append({
+                'farmer': farmer_data,
+                'products': [products_data[p.pk] for p in farmer.product_set.all()],
+                'certificates': [certificates_data[c.pk] for c in farmer.certificate_set.all()],
+            })
 
         return Response(results)
@@ -82,6 +82,17 @@ DATABASES = {
     }
 }
 
+# coopératives placées sur leur propre base: {'slug': 'alias de DATABASES'}
+TENANT_DATABASES = {}
+
+# refuse les requêtes sans en-tête 'X-Cooperative', pour les déploiements de plusieurs coopératives
+TENANT_HEADER_REQUIRED = False
+
+DATABASE_ROUTERS = ['api.db_routers.TenantRouter']
+
+# au-delà, la suppression d'un farmer se fait en tâche de fond
+FARMER_DELETE_CHUNK_SIZE = 1000
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -122,5 +133,10 @@ USE_TZ = True
 STATIC_URL = '/static/'
 
 REST_FRAMEWORK = {
-    'TEST_REQUEST_DEFAULT_FORMAT': 'json'
+    'TEST_REQUEST_DEFAULT_FORMAT': 'json',
+    'DEFAULT_RENDERER_CLASSES': [
+        'rest_framework.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+        'api.renderers.ColumnarJSONRenderer', # format colonne pour les exports
+    ],
 }
@@ -0,0 +1,30 @@
+"""
+Django settings for the api only workers (gunicorn, management commands).
+
+Use it with 'DJANGO_SETTINGS_MODULE=api_test_project.settings_api'.
+It loads less apps and runs less middlewares per request than the
+default settings, the admin stays available at 'admin/'.
+Measure the difference with './manage.py bench_startup'.
+"""
+
+from .settings import *  # noqa
+
+# staticfiles n'est utile qu'à runserver et collectstatic
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app != 'django.contrib.staticfiles']
+
+# sessions, authentification et messages ne servent qu'à l'admin
+ADMIN_MIDDLEWARE = [
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+]
+
+MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'api.middleware.AdminOnlyMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+# les middlewares de l'admin sont chargés par AdminOnlyMiddleware
+SILENCED_SYSTEM_CHECKS = ['admin.E408', 'admin.E409', 'admin.E410']
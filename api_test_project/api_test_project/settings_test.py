@@ -0,0 +1,14 @@
+"""
+Django settings for the tests.
+
+'./manage.py test' uses them by default. They add the database of a
+cooperative, used by the tests of `TENANT_DATABASES`: it stays in
+memory and is created only by the test runner.
+"""
+
+from .settings import *  # noqa
+
+DATABASES = dict(DATABASES, cooperative={
+    'ENGINE': 'django.db.backends.sqlite3',
+    'NAME': ':memory:',
+})
@@ -5,7 +5,9 @@ import sys
 
 
 def main():
-    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_test_project.settings')
+    # les tests ajoutent la base d'une coopérative, voir settings_test.py
+    settings = 'api_test_project.settings_test' if sys.argv[1:2] == ['test'] else 'api_test_project.settings'
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings)
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc: